@@ -1,13 +1,24 @@
+import atexit
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
-import requests
 import time
-from datetime import datetime, date
-import talib
-import matplotlib.pyplot as plt
-import sqlite3
-import uuid
+from datetime import datetime
+from db import ConnectionPool
+from migrations import (SQL_DEPOSIT_HISTORY, SQL_HISTORY_PAGE_ORDER, SQL_TRANSACTION_HISTORY,
+                        STREAMLIT_MIGRATIONS, migrate)
+from price_client import PRIMARY_SYMBOL, PriceClient, PriceUnavailable
+from collector import PriceCollector
+from tick_store import TickStore
+from backfill import startup_backfiller
+import portfolio
+import metrics
+import signals
+from markets import parse_symbols
+from candles import TIMEFRAMES, is_candles
+from chart_image import ChartRenderer, ChartTheme
+from chart_component import live_chart
 
 # --- Configuration ---
 APP_VERSION = "Portovedo | v0.2.1" # Incremented version
@@ -15,14 +26,55 @@ PAGE_TITLE = "Bitcoin Real-Time Tracker (EUR)"
 PAGE_ICON = "₿"
 REFRESH_INTERVAL_SECONDS = 5
 MAX_DATA_POINTS = 300    
+HISTORY_PAGE_SIZE = 50
+# Row counts offered by the raw data log, capped at what the tick buffer holds
+RAW_LOG_ROWS = tuple(n for n in (20, 100, 1000) if n < MAX_DATA_POINTS) + (MAX_DATA_POINTS,)
+# 'rest' polls the ticker every REFRESH_INTERVAL_SECONDS, 'stream' consumes the WebSocket trade stream
+PRICE_FEED = os.environ.get('BTC_PRICE_FEED', 'rest')
+STREAM_MIN_INTERVAL = 0.25
+# Comma-separated symbols tracked in the Markets tab; BTCEUR always comes first
+# since the tracker and wallet are built around it
+WATCHLIST = (PRIMARY_SYMBOL,) + tuple(
+    s for s in parse_symbols(os.environ.get('BTC_WATCHLIST', '')) if s != PRIMARY_SYMBOL)
 DB_NAME = 'bitcoin_tracker_streamlit.db'
+TICKS_DB = 'bitcoin_ticks_streamlit.db'
 PLOT_BG_COLOR = '#0E1117' 
 PLOT_TEXT_COLOR = '#FAFAFA'
+CANDLE_UP_COLOR = '#26A69A'
+CANDLE_DOWN_COLOR = '#EF5350'
+CHART_THEME = ChartTheme(PLOT_BG_COLOR, PLOT_TEXT_COLOR, CANDLE_UP_COLOR, CANDLE_DOWN_COLOR)
+# Chart sources: raw ticks or one of the candle timeframes
+CHART_VIEWS = ('Ticks',) + tuple(TIMEFRAMES)
+# 'browser' streams new rows to a client-side chart, 'image' renders PNGs on the server
+CHART_RENDERER = os.environ.get('BTC_CHART_RENDERER', 'browser')
+CHART_SIZE = (4, 2) # inches
+CHART_DPI = 200
+SIGNAL_DISPLAY = {
+    signals.STRONG_BUY: ("🚀 TAS À ESPERA DO QUE MANOOOOH, MELHOR ALTURA PARA COMPRAR! 🚀", "#00FF00"),
+    signals.STRONG_SELL: ("💰 TOCA A VENDER BRO, NÃO ARRANJAS MELHOR MANOOOOOOH! 💰", "#FF4444"),
+    signals.BUY: ("TALVEZ DEVESSES COMPRAR, DIGO EU BRO", "#00CC00"),
+    signals.SELL: ("DEVIAS PENSAR EM VENDER ESSA MERDA BRO", "#CC0000"),
+    signals.HOLD: ("AGUENTA AÍ OH MANOOOH", "#008080"),
+}
+
+# --- SQL Statements ---
+# Kept as constants so each pooled connection prepares them once and reuses them.
+SQL_SELECT_STATE = "SELECT value FROM app_state WHERE key = ?"
+SQL_UPDATE_STATE = "UPDATE app_state SET value = ? WHERE key = ?"
+SQL_UPSERT_STATE = ("INSERT INTO app_state (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value")
 
 # --- Database Initialization ---
-def initialize_db():
+@st.cache_resource
+def get_db():
+    """Process-wide connection pool, shared by all sessions and reruns."""
+    pool = ConnectionPool(DB_NAME)
+    initialize_db(pool)
+    return pool
+
+def initialize_db(pool):
     """Initializes the SQLite database and creates tables if they don't exist."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with pool.transaction() as conn:
         c = conn.cursor()
         c.execute('''CREATE TABLE IF NOT EXISTS transactions
                      (transaction_id TEXT PRIMARY KEY, 
@@ -46,150 +98,110 @@ def initialize_db():
         }
         for key, value in initial_states.items():
             c.execute("INSERT OR IGNORE INTO app_state (key, value) VALUES (?, ?)", (key, value))
-        conn.commit()
+    with pool.connection() as conn:
+        migrate(conn, STREAMLIT_MIGRATIONS)
+    with pool.transaction() as conn:
+        portfolio.ensure_aggregates(conn)
 
 # --- Session State Initialization ---
 def initialize_session_state():
     """Initializes the Streamlit session state variables from DB or defaults."""
     if 'initialized' not in st.session_state:
-        st.session_state.price_data = []
-        st.session_state.times_data = []
-        st.session_state.rsi_data = []
-        st.session_state.sma20_data = []
-        st.session_state.sma50_data = []
-        
-        st.session_state.daily_high = 0.0
-        st.session_state.daily_low = float('inf')
-        st.session_state.last_reset_date = date.min
-        
         # Load persistent states from DB
         try:
-            with sqlite3.connect(DB_NAME) as conn:
+            with get_db().connection() as conn:
                 c = conn.cursor()
-                for key in ['all_time_high', 'eur_balance', 'total_eur_deposited']:
-                    c.execute("SELECT value FROM app_state WHERE key = ?", (key,))
+                for key in ['eur_balance', 'total_eur_deposited']:
+                    c.execute(SQL_SELECT_STATE, (key,))
                     result = c.fetchone()
                     st.session_state[key] = result[0] if result else 0.0
         except Exception as e:
             st.error(f"Error loading app state from database: {e}")
-            st.session_state.all_time_high = 0.0
             st.session_state.eur_balance = 0.0
             st.session_state.total_eur_deposited = 0.0
             
-        st.session_state.current_price_eur = 0.0
         st.session_state.trading_signal = "Analyzing Market..."
         st.session_state.signal_color = PLOT_TEXT_COLOR
-        st.session_state.log_messages = [] 
         st.session_state.initialized = True
 
-# --- Database Update Functions ---
-def update_db_value(key, value):
-    """Updates a key-value pair in the app_state table."""
-    try:
-        with sqlite3.connect(DB_NAME) as conn:
-            c = conn.cursor()
-            c.execute("UPDATE app_state SET value = ? WHERE key = ?", (value, key))
-            conn.commit()
-    except Exception as e:
-        st.error(f"Error updating {key} in database: {e}")
-
-# --- Data Fetching and Processing ---
-def get_bitcoin_data():
-    try:
-        url = "https://api.binance.com/api/v3/ticker/price?symbol=BTCEUR"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status() 
-        data = response.json()
-        return float(data['price'])
-    except requests.exceptions.RequestException: 
-        try:
-            url_usdt = "https://api.binance.com/api/v3/ticker/price?symbol=BTCUSDT"
-            response_usdt = requests.get(url_usdt, timeout=10)
-            response_usdt.raise_for_status()
-            data_usdt = response_usdt.json()
-            return float(data_usdt['price']) * 0.92 
-        except Exception as e_usdt:
-            st.session_state.log_messages.append(f"BTCUSDT API error: {e_usdt}")
-            st.error(f"Failed to fetch Bitcoin price. Last error: {e_usdt}")
-            return None
-    except Exception as e:
-        st.session_state.log_messages.append(f"General error fetching price: {e}")
-        return None
+# --- Data Collection ---
+@st.cache_resource
+def get_price_client():
+    """Process-wide price client, so every request reuses the same pooled session."""
+    return PriceClient(timeout=10)
+
+@st.cache_resource
+def get_collector():
+    """Single process-wide collector; sessions only read its snapshots."""
+    pool = get_db()
+    all_time_highs = {}
+    with pool.connection() as conn:
+        for symbol in WATCHLIST:
+            result = conn.execute(SQL_SELECT_STATE, (all_time_high_key(symbol),)).fetchone()
+            all_time_highs[symbol] = result[0] if result else 0.0
+    collector = PriceCollector(
+        get_price_client().get_prices,
+        WATCHLIST,
+        MAX_DATA_POINTS,
+        interval=REFRESH_INTERVAL_SECONDS,
+        all_time_highs=all_time_highs,
+        on_new_high=lambda symbol, price: save_all_time_high(pool, symbol, price),
+        stream=PRICE_FEED == 'stream',
+        stream_min_interval=STREAM_MIN_INTERVAL,
+        tick_store=TickStore(TICKS_DB),
+        backfiller=startup_backfiller(),
+    )
+    collector.start()
+    atexit.register(collector.stop) # flush pending ticks on shutdown
+    return collector
+
+def all_time_high_key(symbol):
+    # The BTCEUR key predates the watchlist
+    return 'all_time_high' if symbol == PRIMARY_SYMBOL else f'all_time_high:{symbol}'
+
+def save_all_time_high(pool, symbol, price):
+    # Runs on the collector thread, so no st.* calls here
+    with metrics.DB_SECONDS.labels('all_time_high').time(), pool.transaction() as conn:
+        conn.execute(SQL_UPSERT_STATE, (all_time_high_key(symbol), price))
+
+def load_snapshot():
+    """Points this session at the collector's latest shared snapshot."""
+    snapshot = get_collector().snapshot()
+    st.session_state.series = snapshot.series
+    st.session_state.candles = snapshot.candles
+    st.session_state.current_price_eur = snapshot.current_price
+    st.session_state.daily_high = snapshot.daily_high
+    st.session_state.daily_low = snapshot.daily_low
+    st.session_state.all_time_high = snapshot.all_time_high
+    st.session_state.price_conversion = snapshot.conversion
+    st.session_state.markets = snapshot.markets
+    st.session_state.log_messages = list(snapshot.log_messages)
+    st.session_state.tick_received_at = snapshot.received_at
+    return snapshot
 
 def generate_trading_signal(rsi, current_price, sma20, sma50):
-    signal = "HOLD"
-    color = PLOT_TEXT_COLOR 
-    if pd.isna(rsi) or pd.isna(sma20) or pd.isna(sma50):
-        return "Data insufficient for signal", color
-    if (rsi < 30 and sma20 > sma50 and current_price > sma50):
-        signal = "🚀 TAS À ESPERA DO QUE MANOOOOH, MELHOR ALTURA PARA COMPRAR! 🚀"
-        color = "#00FF00"
-    elif (rsi > 70 and sma20 < sma50 and current_price < sma50):
-        signal = "💰 TOCA A VENDER BRO, NÃO ARRANJAS MELHOR MANOOOOOOH! 💰"
-        color = "#FF4444"
-    elif (rsi < 35 and current_price > sma20):
-        signal = "TALVEZ DEVESSES COMPRAR, DIGO EU BRO"
-        color = "#00CC00"
-    elif (rsi > 65 and current_price < sma20):
-        signal = "DEVIAS PENSAR EM VENDER ESSA MERDA BRO"
-        color = "#CC0000"
-    else:
-        signal = "AGUENTA AÍ OH MANOOOH"
-        color = "#008080"
-    return signal, color
-
-def update_technical_indicators():
-    if len(st.session_state.price_data) > 14:
-        prices_array = np.array(st.session_state.price_data, dtype=float)
-        rsi_values = talib.RSI(prices_array, timeperiod=14)
-        st.session_state.rsi_data.append(rsi_values[-1])
-        if len(st.session_state.price_data) >= 20:
-            st.session_state.sma20_data.append(talib.SMA(prices_array, timeperiod=20)[-1])
-        else:
-            st.session_state.sma20_data.append(np.nan)
-        if len(st.session_state.price_data) >= 50:
-            st.session_state.sma50_data.append(talib.SMA(prices_array, timeperiod=50)[-1])
-        else:
-            st.session_state.sma50_data.append(np.nan)
-        
-        if not pd.isna(st.session_state.rsi_data[-1]) and \
-           not pd.isna(st.session_state.sma20_data[-1]) and \
-           not pd.isna(st.session_state.sma50_data[-1]):
+    code = signals.classify(rsi, current_price, sma20, sma50)
+    if code is None:
+        return "Data insufficient for signal", PLOT_TEXT_COLOR
+    return SIGNAL_DISPLAY[code]
+
+def update_trading_signal():
+    series = st.session_state.series
+    rsi, sma20, sma50 = series.last('rsi'), series.last('sma20'), series.last('sma50')
+
+    if len(series) > 14:
+        if not pd.isna(rsi) and not pd.isna(sma20) and not pd.isna(sma50):
             signal, color = generate_trading_signal(
-                st.session_state.rsi_data[-1], st.session_state.current_price_eur,
-                st.session_state.sma20_data[-1], st.session_state.sma50_data[-1])
+                rsi, st.session_state.current_price_eur, sma20, sma50)
             st.session_state.trading_signal = signal
             st.session_state.signal_color = color
         else:
             st.session_state.trading_signal = "Awaiting more data for full analysis..." 
             st.session_state.signal_color = PLOT_TEXT_COLOR
     else: 
-        st.session_state.rsi_data.append(np.nan)
-        st.session_state.sma20_data.append(np.nan)
-        st.session_state.sma50_data.append(np.nan)
         st.session_state.trading_signal = "Collecting initial data..." 
         st.session_state.signal_color = PLOT_TEXT_COLOR
 
-def update_data_storage():
-    if len(st.session_state.price_data) > MAX_DATA_POINTS:
-        st.session_state.price_data.pop(0)
-        st.session_state.times_data.pop(0)
-        if st.session_state.rsi_data: st.session_state.rsi_data.pop(0)
-        if st.session_state.sma20_data: st.session_state.sma20_data.pop(0)
-        if st.session_state.sma50_data: st.session_state.sma50_data.pop(0)
-
-def update_daily_stats(current_price):
-    current_d = date.today()
-    if current_d != st.session_state.get('last_reset_date', date.min):
-        st.session_state.daily_high = current_price
-        st.session_state.daily_low = current_price
-        st.session_state.last_reset_date = current_d
-    st.session_state.daily_high = max(st.session_state.daily_high, current_price)
-    st.session_state.daily_low = min(st.session_state.daily_low, current_price)
-    if current_price > st.session_state.all_time_high:
-        st.session_state.all_time_high = current_price
-        update_db_value('all_time_high', st.session_state.all_time_high)
-
 
 # --- UI Rendering Functions ---
 def display_price_statistics():
@@ -198,61 +210,47 @@ def display_price_statistics():
     col2.metric("Daily High", f"{st.session_state.daily_high:,.2f} EUR")
     col3.metric("Daily Low", f"{st.session_state.daily_low:,.2f} EUR")
     col4.metric("All-Time High", f"{st.session_state.all_time_high:,.2f} EUR")
+    if st.session_state.price_conversion:
+        st.caption(f"BTCEUR unavailable; price converted from BTCUSDT ({st.session_state.price_conversion})")
+
+@st.cache_resource
+def get_chart_renderer():
+    """Shared across sessions: they all chart the same snapshot buffers."""
+    return ChartRenderer()
 
 def display_charts():
     chart_col, _ = st.columns([2,1]) 
     with chart_col:
-        if not st.session_state.price_data or len(st.session_state.price_data) < 2: 
-            st.info(st.session_state.trading_signal) 
+        view = st.radio("Chart", CHART_VIEWS, horizontal=True, key="chart_view")
+        series = st.session_state.series if view == 'Ticks' else st.session_state.candles[view]
+        if len(series) < 2: 
+            st.info(st.session_state.trading_signal if view == 'Ticks' else f"Collecting {view} candles...") 
             return
 
-        fig, (price_ax, rsi_ax) = plt.subplots(2, 1, figsize=(4, 2), sharex=True, facecolor=PLOT_BG_COLOR) 
-        fig.patch.set_facecolor(PLOT_BG_COLOR)
-
-        price_ax.set_facecolor(PLOT_BG_COLOR)
-        price_ax.tick_params(colors=PLOT_TEXT_COLOR, which='both', labelsize=3) 
-        for spine in price_ax.spines.values(): spine.set_color(PLOT_TEXT_COLOR)
-        price_ax.set_title('Bitcoin Price (EUR)', color=PLOT_TEXT_COLOR, fontsize=5) 
-        price_ax.set_ylabel('Price', color=PLOT_TEXT_COLOR, fontsize=4) 
-        price_ax.grid(True, alpha=0.15, color=PLOT_TEXT_COLOR, linestyle=':') 
-        price_ax.plot(st.session_state.times_data, st.session_state.price_data, label='BTC/EUR', color='#17BECF', linewidth=0.6) 
-        if len(st.session_state.sma20_data) == len(st.session_state.times_data):
-            price_ax.plot(st.session_state.times_data, st.session_state.sma20_data, label='SMA20', color='#FFA500', linewidth=0.4, linestyle='--') 
-        if len(st.session_state.sma50_data) == len(st.session_state.times_data):
-            price_ax.plot(st.session_state.times_data, st.session_state.sma50_data, label='SMA50', color='#FF00FF', linewidth=0.4, linestyle='--') 
-        leg1 = price_ax.legend(loc='upper left', facecolor=PLOT_BG_COLOR, labelcolor=PLOT_TEXT_COLOR, fontsize=3) 
-        for text in leg1.get_texts(): text.set_color(PLOT_TEXT_COLOR)
-
-        rsi_ax.set_facecolor(PLOT_BG_COLOR)
-        rsi_ax.tick_params(colors=PLOT_TEXT_COLOR, which='both', labelrotation=10, labelsize=3) 
-        for spine in rsi_ax.spines.values(): spine.set_color(PLOT_TEXT_COLOR)
-        rsi_ax.set_title('RSI Indicator', color=PLOT_TEXT_COLOR, fontsize=5) 
-        rsi_ax.set_ylabel('RSI', color=PLOT_TEXT_COLOR, fontsize=4) 
-        rsi_ax.set_ylim(0, 100)
-        rsi_ax.grid(True, alpha=0.15, color=PLOT_TEXT_COLOR, linestyle=':') 
-        if len(st.session_state.rsi_data) == len(st.session_state.times_data):
-            rsi_ax.plot(st.session_state.times_data, st.session_state.rsi_data, label='RSI', color='#9467BD', linewidth=0.6) 
-        rsi_ax.axhline(y=70, color='#FF4444', linestyle='--', linewidth=0.4) 
-        rsi_ax.axhline(y=30, color='#00FF00', linestyle='--', linewidth=0.4) 
-        leg2 = rsi_ax.legend(loc='upper left', facecolor=PLOT_BG_COLOR, labelcolor=PLOT_TEXT_COLOR, fontsize=3) 
-        for text in leg2.get_texts(): text.set_color(PLOT_TEXT_COLOR)
-
-        plt.xticks(rotation=10, ha='right') 
-        plt.tight_layout(pad=0.3) 
-        st.pyplot(fig)
-        plt.close(fig)
+        with metrics.STAGE_SECONDS.labels('render').time():
+            if CHART_RENDERER == 'browser':
+                live_chart(view, series, CHART_THEME)
+            else:
+                # Only rendered again when the buffer, size or theme changed
+                png = get_chart_renderer().render(view, series, CHART_SIZE, CHART_DPI, CHART_THEME)
+                st.image(png)
+
+        # Tick-to-screen: measured once per tick, by whichever session shows it first
+        received_at = st.session_state.tick_received_at
+        if get_collector().mark_shown(received_at):
+            metrics.TICK_TO_SCREEN_SECONDS.observe(time.time() - received_at)
 
 def display_trading_signal():
     st.markdown(f"<h4 style='text-align: center; color: {st.session_state.signal_color};'>{st.session_state.trading_signal}</h4>", unsafe_allow_html=True)
 
-def get_current_btc_holdings():
+def get_portfolio():
+    """Reads holdings, cost basis, realized P/L and balances from the maintained aggregates."""
     try:
-        with sqlite3.connect(DB_NAME) as conn:
-            df = pd.read_sql_query("SELECT SUM(btc_amount) as total_btc FROM transactions", conn)
-            return df['total_btc'].iloc[0] if not df.empty and not pd.isna(df['total_btc'].iloc[0]) else 0.0
+        with metrics.DB_SECONDS.labels('portfolio').time(), get_db().connection() as conn:
+            return portfolio.load_aggregates(conn)
     except Exception as e:
-        st.error(f"Error fetching BTC holdings: {e}")
-        return 0.0
+        st.error(f"Error fetching portfolio: {e}")
+        return dict.fromkeys(portfolio.AGGREGATE_KEYS, 0.0)
 
 # --- Wallet Tab Functions ---
 def display_wallet_tab():
@@ -266,17 +264,11 @@ def display_wallet_tab():
         submit_deposit = st.form_submit_button("Deposit EUR")
 
         if submit_deposit and amount_to_deposit > 0:
-            st.session_state.eur_balance += amount_to_deposit
-            st.session_state.total_eur_deposited += amount_to_deposit
-            update_db_value('eur_balance', st.session_state.eur_balance)
-            update_db_value('total_eur_deposited', st.session_state.total_eur_deposited)
-            
             try:
-                with sqlite3.connect(DB_NAME) as conn:
-                    c = conn.cursor()
-                    c.execute("INSERT INTO deposits (deposit_id, timestamp, eur_deposited) VALUES (?, ?, ?)",
-                              (str(uuid.uuid4()), datetime.now().strftime("%Y-%m-%d %H:%M:%S"), amount_to_deposit))
-                    conn.commit()
+                with metrics.DB_SECONDS.labels('deposit').time(), get_db().transaction() as conn:
+                    aggregates = portfolio.record_deposit(conn, datetime.now(), amount_to_deposit)
+                st.session_state.eur_balance = aggregates['eur_balance']
+                st.session_state.total_eur_deposited = aggregates['total_eur_deposited']
                 st.success(f"Successfully deposited {amount_to_deposit:,.2f} EUR.")
                 st.rerun() # MODIFIED from st.experimental_rerun()
             except Exception as e:
@@ -284,7 +276,8 @@ def display_wallet_tab():
     st.markdown("---")
 
     st.subheader("📈 Portfolio Overview")
-    total_btc_held = get_current_btc_holdings()
+    aggregates = get_portfolio()
+    total_btc_held = aggregates['btc_holdings']
     current_value_of_btc_holdings = total_btc_held * current_btc_price
     overall_pl = (current_value_of_btc_holdings + st.session_state.eur_balance) - st.session_state.total_eur_deposited
 
@@ -292,17 +285,21 @@ def display_wallet_tab():
     col1.metric("EUR Balance", f"{st.session_state.eur_balance:,.2f} EUR")
     col2.metric("Total BTC Value", f"{current_value_of_btc_holdings:,.2f} EUR", f"{total_btc_held:.8f} BTC")
     col3.metric("Total Net Deposited", f"{st.session_state.total_eur_deposited:,.2f} EUR")
+    unrealized_pl = current_value_of_btc_holdings - aggregates['cost_basis']
     
     pl_color_style = "color: green;" if overall_pl >= 0 else "color: red;"
     col4.markdown(f"""
     <div style="font-weight: bold; font-size: 0.875rem; color: #808495;">OVERALL P/L</div>
     <div style="font-size: 1.25rem; {pl_color_style}">{overall_pl:,.2f} EUR</div>
     """, unsafe_allow_html=True)
+    st.caption(f"Cost basis: {aggregates['cost_basis']:,.2f} EUR | "
+               f"Realized P/L: {aggregates['realized_pl']:+,.2f} EUR | "
+               f"Unrealized P/L: {unrealized_pl:+,.2f} EUR")
     st.markdown("---")
 
     if current_btc_price <= 0:
         st.warning("Waiting for current price data to enable trading.")
-        if st.session_state.price_data: current_btc_price = st.session_state.price_data[-1]
+        if len(st.session_state.series): current_btc_price = st.session_state.series.last('price')
         else: return
 
     buy_col, sell_col = st.columns(2)
@@ -321,15 +318,13 @@ def display_wallet_tab():
                     st.error("Insufficient EUR balance to make this purchase.")
                 elif buy_amount_eur > 0 :
                     btc_bought = buy_amount_eur / current_btc_price
-                    timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    traded_at = datetime.now()
                     try:
-                        with sqlite3.connect(DB_NAME) as conn:
-                            c = conn.cursor()
-                            c.execute("INSERT INTO transactions (transaction_id, timestamp, type, price, eur_amount, btc_amount) VALUES (?, ?, ?, ?, ?, ?)",
-                                      (str(uuid.uuid4()), timestamp_str, 'buy', current_btc_price, -buy_amount_eur, btc_bought))
-                            conn.commit()
-                        st.session_state.eur_balance -= buy_amount_eur
-                        update_db_value('eur_balance', st.session_state.eur_balance)
+                        with metrics.DB_SECONDS.labels('trade').time(), get_db().transaction() as conn:
+                            aggregates = portfolio.record_trade(
+                                conn, 'buy', traded_at, current_btc_price, -buy_amount_eur, btc_bought,
+                                st.session_state.price_conversion)
+                        st.session_state.eur_balance = aggregates['eur_balance']
                         st.success(f"Bought {btc_bought:.8f} BTC for {buy_amount_eur:,.2f} EUR.")
                         st.rerun() # MODIFIED from st.experimental_rerun()
                     except Exception as e:
@@ -337,7 +332,7 @@ def display_wallet_tab():
     
     with sell_col:
         st.subheader("💸 Sell Bitcoin")
-        current_holdings_for_sell = get_current_btc_holdings()
+        current_holdings_for_sell = total_btc_held
         if current_holdings_for_sell <= 0:
             st.info("No Bitcoin to sell.")
         else:
@@ -349,28 +344,76 @@ def display_wallet_tab():
 
                 if submit_sell and sell_amount_btc > 0:
                     eur_received = sell_amount_btc * current_btc_price
-                    timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    traded_at = datetime.now()
                     try:
-                        with sqlite3.connect(DB_NAME) as conn:
-                            c = conn.cursor()
-                            c.execute("INSERT INTO transactions (transaction_id, timestamp, type, price, eur_amount, btc_amount) VALUES (?, ?, ?, ?, ?, ?)",
-                                      (str(uuid.uuid4()), timestamp_str, 'sell', current_btc_price, eur_received, -sell_amount_btc))
-                            conn.commit()
-                        st.session_state.eur_balance += eur_received
-                        update_db_value('eur_balance', st.session_state.eur_balance)
+                        with metrics.DB_SECONDS.labels('trade').time(), get_db().transaction() as conn:
+                            aggregates = portfolio.record_trade(
+                                conn, 'sell', traded_at, current_btc_price, eur_received, -sell_amount_btc,
+                                st.session_state.price_conversion)
+                        st.session_state.eur_balance = aggregates['eur_balance']
                         st.success(f"Sold {sell_amount_btc:.8f} BTC for {eur_received:,.2f} EUR.")
                         st.rerun() # MODIFIED from st.experimental_rerun()
                     except Exception as e:
                         st.error(f"Error saving sell transaction: {e}")
 
 # --- History Tab Functions ---
+def fetch_history_page(select_sql, cursor, filters=()):
+    """Fetches one page, newest first, using keyset pagination on (ts_epoch, rowid).
+
+    Returns the page and whether older rows exist. ``cursor`` is the
+    (ts_epoch, rowid) of the last row on the previous page, or None.
+    """
+    conditions = [f"{column} = ?" for column, _ in filters]
+    params = [value for _, value in filters]
+    if cursor is not None:
+        conditions.append("(ts_epoch, rowid) < (?, ?)")
+        params.extend(cursor)
+    sql = select_sql
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += SQL_HISTORY_PAGE_ORDER
+    params.append(HISTORY_PAGE_SIZE + 1)
+    with metrics.DB_SECONDS.labels('history_page').time(), get_db().connection() as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    return df.iloc[:HISTORY_PAGE_SIZE], len(df) > HISTORY_PAGE_SIZE
+
+def display_history_page(key, select_sql, filters=()):
+    """Shows Newer/Older controls and returns the current page of a history table."""
+    cursors = st.session_state.setdefault(key, [None])
+    page, has_older = fetch_history_page(select_sql, cursors[-1], filters)
+
+    newer_col, page_col, older_col = st.columns([1, 2, 1])
+    if newer_col.button("◀ Newer", key=f"{key}_newer", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(cursors)}")
+    if older_col.button("Older ▶", key=f"{key}_older", disabled=not has_older):
+        last = page.iloc[-1]
+        cursors.append((int(last['ts_epoch']), int(last['rowid'])))
+        st.rerun()
+    return page
+
+def display_markets_tab():
+    st.header("📈 Markets")
+    st.caption(f"{len(WATCHLIST)} symbols from one batched ticker request per refresh. "
+               "Set BTC_WATCHLIST (e.g. \"ETHEUR,SOLEUR\") to track more pairs.")
+    st.dataframe(
+        st.session_state.markets,
+        use_container_width=True,
+        column_config={
+            name: st.column_config.NumberColumn(name, format="%.2f")
+            for name in ['Price', 'Daily High', 'Daily Low', 'ATH', 'RSI', 'SMA20', 'SMA50']
+        },
+    )
+
 def display_history_tab():
     st.header("📜 Transaction History")
     
     st.subheader("Bitcoin Transactions (Buy/Sell)")
+    type_filter = st.radio("Type", ["All", "Buy", "Sell"], horizontal=True, key="history_type")
+    filters = () if type_filter == "All" else (('type', type_filter.lower()),)
     try:
-        with sqlite3.connect(DB_NAME) as conn:
-            btc_history_df = pd.read_sql_query("SELECT timestamp, type, price, eur_amount, btc_amount FROM transactions ORDER BY timestamp DESC", conn)
+        btc_history_df = display_history_page(f"btc_history_{type_filter}", SQL_TRANSACTION_HISTORY, filters)
     except Exception as e:
         st.error(f"Error loading BTC transaction history: {e}")
         btc_history_df = pd.DataFrame()
@@ -383,13 +426,13 @@ def display_history_tab():
         display_btc_df['eur_amount'] = display_btc_df['eur_amount'].map('{:,.2f} EUR'.format) 
         display_btc_df['btc_amount'] = display_btc_df['btc_amount'].map('{:,.8f} BTC'.format)
         display_btc_df['type'] = display_btc_df['type'].str.capitalize()
-        st.dataframe(display_btc_df[['timestamp', 'type', 'price', 'eur_amount', 'btc_amount']], use_container_width=True)
+        display_btc_df['conversion'] = display_btc_df['conversion'].fillna('BTCEUR')
+        st.dataframe(display_btc_df[['timestamp', 'type', 'price', 'eur_amount', 'btc_amount', 'conversion']], use_container_width=True)
 
     st.markdown("---")
     st.subheader("EUR Deposits")
     try:
-        with sqlite3.connect(DB_NAME) as conn:
-            deposit_history_df = pd.read_sql_query("SELECT timestamp, eur_deposited FROM deposits ORDER BY timestamp DESC", conn)
+        deposit_history_df = display_history_page("deposit_history", SQL_DEPOSIT_HISTORY)
     except Exception as e:
         st.error(f"Error loading deposit history: {e}")
         deposit_history_df = pd.DataFrame()
@@ -402,38 +445,70 @@ def display_history_tab():
         st.dataframe(display_deposit_df[['timestamp', 'eur_deposited']], use_container_width=True)
 
 
+@st.cache_data(max_entries=8, show_spinner=False)
+def raw_log_frame(_series, version, rows):
+    """Newest-first table of the last ``rows`` ticks; ``version`` stands in for the unhashed buffer."""
+    n = min(rows, len(_series))
+    return pd.DataFrame({
+        "Time": _series.times()[-n:][::-1],
+        "Price": _series['price'][-n:][::-1],
+        "RSI": _series['rsi'][-n:][::-1],
+        "SMA20": _series['sma20'][-n:][::-1],
+        "SMA50": _series['sma50'][-n:][::-1],
+    })
+
 def display_raw_data_log():
-    with st.expander("📊 View Recent Raw Data (Last 20 entries)"):
-        if not st.session_state.price_data:
+    with st.expander("📊 View Recent Raw Data"):
+        series = st.session_state.series
+        if len(series) == 0:
             st.caption("No data yet.")
             return
-        data_len = len(st.session_state.price_data)
-        start_index = max(0, data_len - 20)
-        times = [t.strftime("%H:%M:%S") for t in st.session_state.times_data[start_index:]]
-        prices_display = [f"{p:,.2f}€" for p in st.session_state.price_data[start_index:]] 
-        
-        rsi_display = [f"{r:.2f}" if not pd.isna(r) else "N/A" for r in st.session_state.rsi_data[start_index:]] if len(st.session_state.rsi_data) >= data_len else ["N/A"] * len(times)
-        sma20_display = [f"{s:,.2f}" if not pd.isna(s) else "N/A" for s in st.session_state.sma20_data[start_index:]] if len(st.session_state.sma20_data) >= data_len else ["N/A"] * len(times)
-        sma50_display = [f"{s:,.2f}" if not pd.isna(s) else "N/A" for s in st.session_state.sma50_data[start_index:]] if len(st.session_state.sma50_data) >= data_len else ["N/A"] * len(times)
-
-        min_len = min(len(times), len(prices_display), len(rsi_display), len(sma20_display), len(sma50_display))
-        
-        df_data = {
-            "Time": times[:min_len],
-            "Price": prices_display[:min_len],
-            "RSI": rsi_display[:min_len],
-            "SMA20": sma20_display[:min_len],
-            "SMA50": sma50_display[:min_len]
-        }
-        
-        log_df = pd.DataFrame(df_data)
-        st.dataframe(log_df.sort_index(ascending=False), use_container_width=True, height=200)
+        rows = st.selectbox("Rows", RAW_LOG_ROWS, key="raw_log_rows")
+        # Formatting is left to the column config, so a rerun without new ticks does no work
+        st.dataframe(
+            raw_log_frame(series, series.version, rows),
+            use_container_width=True,
+            height=200,
+            hide_index=True,
+            column_config={
+                "Time": st.column_config.DatetimeColumn("Time", format="HH:mm:ss"),
+                "Price": st.column_config.NumberColumn("Price", format="%.2f€"),
+                "RSI": st.column_config.NumberColumn("RSI", format="%.2f"),
+                "SMA20": st.column_config.NumberColumn("SMA20", format="%.2f"),
+                "SMA50": st.column_config.NumberColumn("SMA50", format="%.2f"),
+            },
+        )
 
 
     if st.session_state.log_messages:
         with st.expander("⚙️ System Logs"):
             for msg in reversed(st.session_state.log_messages[-10:]): # Show last 10 messages
-                st.caption(f"{datetime.now().strftime('%H:%M:%S')} - {msg}")
+                st.caption(msg) # Collector messages carry their own timestamp
+
+
+# --- Metrics ---
+@st.cache_resource
+def get_metrics_server():
+    """One /metrics endpoint per process; None when metrics are disabled."""
+    return metrics.serve()
+
+def display_metrics_panel():
+    with st.sidebar.expander("⏱️ Metrics"):
+        if not metrics.ENABLED:
+            st.caption("Set BTC_METRICS=1 to time the pipeline stages.")
+            return
+        server = get_metrics_server()
+        if server is not None:
+            host, port = server.server_address[:2]
+            st.caption(f"Prometheus: http://{host}:{port}/metrics")
+        st.dataframe(
+            pd.DataFrame(metrics.summary(), columns=metrics.SUMMARY_COLUMNS),
+            hide_index=True,
+            column_config={
+                name: st.column_config.NumberColumn(name, format="%.2f")
+                for name in metrics.SUMMARY_COLUMNS[3:]
+            },
+        )
 
 
 # --- Main Application ---
@@ -441,27 +516,21 @@ def main():
     st.set_page_config(page_title=PAGE_TITLE, page_icon=PAGE_ICON, layout="wide")
     st.sidebar.title(f"{PAGE_ICON} Options")
     st.sidebar.caption(APP_VERSION) 
+    get_metrics_server()
 
-    initialize_db() 
+    get_db()
     initialize_session_state()
 
-    new_price = get_bitcoin_data()
-    if new_price is not None:
-        st.session_state.current_price_eur = new_price
-        st.session_state.price_data.append(new_price)
-        st.session_state.times_data.append(datetime.now())
-        update_daily_stats(new_price)
-        update_technical_indicators() 
-        update_data_storage()
-    elif not st.session_state.price_data: 
+    snapshot = load_snapshot()
+    update_trading_signal()
+    if not snapshot.fetch_ok and len(snapshot.series) == 0: 
         st.session_state.trading_signal = "Could not fetch initial Bitcoin price. Check connection."
-    elif st.session_state.price_data: 
-         st.session_state.current_price_eur = st.session_state.price_data[-1]
+    elif not snapshot.fetch_ok: 
          st.warning("Using last known price due to API fetch error. Data may be stale.")
 
     st.title(f"{PAGE_ICON} Bitcoin Real-Time Dashboard")
 
-    tab1, tab2, tab3 = st.tabs(["📊 Tracker", "💼 Wallet", "📜 History"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Tracker", "📈 Markets", "💼 Wallet", "📜 History"])
 
     with tab1:
         st.header("Market Tracker")
@@ -474,11 +543,17 @@ def main():
         display_raw_data_log()
 
     with tab2:
-        display_wallet_tab()
+        display_markets_tab()
 
     with tab3:
+        display_wallet_tab()
+
+    with tab4:
         display_history_tab()
     
+    # Last, so it includes this rerun's render timings
+    display_metrics_panel()
+
     # The main st.rerun() at the end of the script handles the periodic refresh
     time.sleep(REFRESH_INTERVAL_SECONDS)
     st.rerun()
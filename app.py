@@ -3,14 +3,57 @@ from tkinter import ttk
 import pandas as pd
 import numpy as np
 from binance.client import Client
-import requests
+import os
 import time
 from datetime import datetime
-import talib
 import threading
+from collections import namedtuple
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import sqlite3
+from indicators import IndicatorEngine
+from ring_buffer import RingBuffer
+from live_chart import LiveChart
+from db import ConnectionPool
+from migrations import (PURCHASES_MIGRATIONS, SQL_INSERT_PURCHASE, SQL_PURCHASES_OLDER_PAGE,
+                        SQL_PURCHASES_PAGE, migrate)
+from price_client import PRIMARY_SYMBOL, PriceClient, PriceUnavailable
+from price_stream import PriceStream
+from tick_store import TickStore
+from backfill import seed_history, startup_backfiller
+from candles import TIMEFRAMES, CandleAggregator
+from ui_dispatch import UiDispatcher
+from text_pane import TextPane
+import signals
+import metrics
+
+MAX_DATA_POINTS = 300
+# Chart sources: raw ticks or one of the candle timeframes
+CHART_VIEWS = ('Ticks',) + tuple(TIMEFRAMES)
+PURCHASES_DB = 'bitcoin_purchases.db'
+TICKS_DB = 'bitcoin_ticks.db'
+PURCHASES_PAGE_SIZE = 200
+# 'rest' polls the ticker once a second, 'stream' consumes the WebSocket trade stream
+PRICE_FEED = os.environ.get('BTC_PRICE_FEED', 'rest')
+POLL_INTERVAL_SECONDS = 1
+STREAM_MIN_INTERVAL = 0.25
+SIGNAL_DISPLAY = {
+    signals.STRONG_BUY: ("🚀 TAS À ESPERA DO QUE MANOOOOH, MELHOR ALTURA PARA COMPRAR! 🚀", "#00ff00"),
+    signals.STRONG_SELL: ("💰 TOCA A VENDER BRO, NÃO ARRANJAS MELHOR MANOOOOOOH! 💰", "#ff4444"),
+    signals.BUY: ("TALVEZ DEVESSES COMPRAR, DIGO EU BRO", "#00cc00"),
+    signals.SELL: ("DEVIAS PENSAR EM VENDER ESSA MERDA BRO", "#cc0000"),
+    signals.HOLD: ("AGUENTA AÍ OH MANOOOH", "#008080"),
+}
+TEXT_ROWS = 20
+
+# Immutable state handed from the price worker to the Tk thread; rows holds
+# copies of the last TEXT_ROWS (times, price, rsi, sma20, sma50) and appended
+# the series' row count, so the text panes can tell which rows are new;
+# received_at is the perf_counter() of a live tick (None for replayed ones)
+TickSnapshot = namedtuple('TickSnapshot', 'price daily_high daily_low all_time_high rsi sma20 sma50 ready rows appended received_at')
+METRICS_REFRESH_MS = 1000
+
+# Single long-lived connection for the purchase windows (all on the Tk thread)
+purchases_db = ConnectionPool(PURCHASES_DB, size=1)
 
 class BitcoinTracker(tk.Tk):
     def __init__(self):
@@ -23,17 +66,23 @@ class BitcoinTracker(tk.Tk):
 
         # Initialize Binance client
         self.client = Client()
+        self.price_client = PriceClient()
+
+        # Bring the purchases database up to the current schema
+        with purchases_db.connection() as conn:
+            migrate(conn, PURCHASES_MIGRATIONS)
 
         self.title("Bitcoin Real-Time Tracker (EUR)")
         self.geometry("1200x1200")
         self.configure(bg=self.bg_color)
 
         # Initialize data storage
-        self.price_data = []
-        self.times_data = []
-        self.rsi_data = []
-        self.sma20_data = []
-        self.sma50_data = []
+        self.series = RingBuffer(MAX_DATA_POINTS)
+        self.indicators = IndicatorEngine()
+        self.candles = CandleAggregator()
+        # Held while the price worker updates the series, indicators and candles,
+        # and while the Tk thread copies them for the chart
+        self.data_lock = threading.Lock()
         self.daily_high = 0
         self.daily_low = float('inf')
 
@@ -73,6 +122,17 @@ class BitcoinTracker(tk.Tk):
         )
         self.low_price_label.pack(side=tk.LEFT, padx=20)
 
+        self.chart_view = tk.StringVar(value='Ticks')
+        self.chart_view_menu = tk.OptionMenu(self.stats_frame, self.chart_view, *CHART_VIEWS)
+        self.chart_view_menu.config(bg=self.bg_color, fg=self.text_color, highlightthickness=0)
+        self.chart_view_menu.pack(side=tk.RIGHT)
+        tk.Label(
+            self.stats_frame,
+            text="Chart:",
+            bg=self.bg_color,
+            fg=self.text_color
+        ).pack(side=tk.RIGHT)
+
         # Create graph frame
         self.graph_frame = tk.Frame(self.main_frame, bg=self.bg_color, height=400)
         self.graph_frame.pack(fill=tk.X, expand=False, padx=10, pady=5)
@@ -82,14 +142,14 @@ class BitcoinTracker(tk.Tk):
         self.price_ax = self.figure.add_subplot(211)
         self.rsi_ax = self.figure.add_subplot(212)
 
-        # Configure dark mode for plots
-        self.price_ax.set_facecolor(self.bg_color)
-        self.rsi_ax.set_facecolor(self.bg_color)
-
         # Create canvas
         self.canvas = FigureCanvasTkAgg(self.figure, self.graph_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+        # Lines and styling are created once; updates only blit new data
+        self.chart = LiveChart(self.figure, self.canvas, self.price_ax, self.rsi_ax,
+                               self.bg_color, self.text_color)
+
         # Create data display frame
         self.data_frame = tk.Frame(self.main_frame, bg=self.bg_color)
         self.data_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -112,18 +172,30 @@ class BitcoinTracker(tk.Tk):
 
         self.add_buttons()
 
-        # Start data collection thread
+        self.all_time_high = 0
+        self.last_reset = datetime.now().date()
+        # fx label of the latest price when it was converted from BTCUSDT
+        self.price_conversion = None
+
+        # Local Prometheus endpoint, only when BTC_METRICS=1
+        self.metrics_server = metrics.serve()
+
+        # Widget updates from the price worker go through the Tk thread
+        self.ui = UiDispatcher(self, self.update_displays)
+
+        self.tick_store = TickStore(TICKS_DB)
+        self.backfiller = startup_backfiller()
+        self.price_stream = None
+
+        # Start data collection
         self.running = True
-        self.data_thread = threading.Thread(target=self.update_data)
+        self.data_thread = threading.Thread(target=self.collect_data)
         self.data_thread.daemon = True
         self.data_thread.start()
         
-        # Start plot update
+        # Start plot and widget updates
         self.update_plot()
-
-        # Add after initializing daily_high and daily_low
-        self.all_time_high = 0
-        self.last_reset = datetime.now().date()
+        self.ui.start()
 
         # Add these lines after other initializations
         self.bind("<F11>", lambda event: self.toggle_fullscreen())
@@ -168,110 +240,47 @@ class BitcoinTracker(tk.Tk):
         self.sma20_text.pack(padx=5, pady=5)
         self.sma50_text.pack(padx=5, pady=5)
 
-    def update_text_widgets(self):
-        # Get last 20 values
-        last_20_prices = self.price_data[-20:]
-        last_20_times = self.times_data[-20:]
-        last_20_rsi = self.rsi_data[-20:] if len(self.rsi_data) > 0 else []
-        last_20_sma20 = self.sma20_data[-20:] if len(self.sma20_data) > 0 else []
-        last_20_sma50 = self.sma50_data[-20:] if len(self.sma50_data) > 0 else []
-
-        # Update text widgets
-        self.price_text.delete(1.0, tk.END)
-        self.rsi_text.delete(1.0, tk.END)
-        self.sma20_text.delete(1.0, tk.END)
-        self.sma50_text.delete(1.0, tk.END)
-
-        for i in range(len(last_20_prices)):
-            time_str = last_20_times[i].strftime("%H:%M:%S")
-            self.price_text.insert(tk.END, f"{time_str}: {last_20_prices[i]:.2f}€\n")
-            if len(last_20_rsi) > i:
-                self.rsi_text.insert(tk.END, f"{time_str}: {last_20_rsi[i]:.2f}\n")
-            if len(last_20_sma20) > i:
-                self.sma20_text.insert(tk.END, f"{time_str}: {last_20_sma20[i]:.2f}\n")
-            if len(last_20_sma50) > i:
-                self.sma50_text.insert(tk.END, f"{time_str}: {last_20_sma50[i]:.2f}\n")
+        # Append-only panes; rows up to text_shown (a series row count) are already on screen
+        self.price_pane = TextPane(self.price_text, TEXT_ROWS)
+        self.rsi_pane = TextPane(self.rsi_text, TEXT_ROWS)
+        self.sma20_pane = TextPane(self.sma20_text, TEXT_ROWS)
+        self.sma50_pane = TextPane(self.sma50_text, TEXT_ROWS)
+        self.text_shown = 0
+
+    def update_text_widgets(self, rows, appended):
+        # Only rows added since the last update are formatted, each exactly once
+        new = appended - self.text_shown
+        self.text_shown = appended
+        if new <= 0:
+            return
+        if new >= TEXT_ROWS:
+            # Nothing on screen is recent any more, including in the panes that skip NaNs
+            for pane in (self.price_pane, self.rsi_pane, self.sma20_pane, self.sma50_pane):
+                pane.clear()
+        times, prices, rsi, sma20, sma50 = (column[-new:] for column in rows)
+        time_strs = [t.strftime("%H:%M:%S") for t in times.astype(object)]
+
+        self.price_pane.append([f"{s}: {p:.2f}€\n" for s, p in zip(time_strs, prices)])
+        for pane, values in ((self.rsi_pane, rsi), (self.sma20_pane, sma20), (self.sma50_pane, sma50)):
+            pane.append([f"{s}: {v:.2f}\n" for s, v in zip(time_strs, values) if not np.isnan(v)])
 
     def generate_trading_signal(self, rsi, current_price, sma20, sma50):
-        signal = "HOLD"
-        color = self.text_color
-        
-        if (rsi < 30 and sma20 > sma50 and current_price > sma50):
-            signal = "🚀 TAS À ESPERA DO QUE MANOOOOH, MELHOR ALTURA PARA COMPRAR! 🚀"
-            color = "#00ff00"
-        elif (rsi > 70 and sma20 < sma50 and current_price < sma50):
-            signal = "💰 TOCA A VENDER BRO, NÃO ARRANJAS MELHOR MANOOOOOOH! 💰"
-            color = "#ff4444"
-        elif (rsi < 35 and current_price > sma20):
-            signal = "TALVEZ DEVESSES COMPRAR, DIGO EU BRO"
-            color = "#00cc00"
-        elif (rsi > 65 and current_price < sma20):
-            signal = "DEVIAS PENSAR EM VENDER ESSA MERDA BRO"
-            color = "#cc0000"
-        else:
-            signal = "AGUENTA AÍ OH MANOOOH"
-            color = "#008080"
-
-        return signal, color
+        code = signals.classify(rsi, current_price, sma20, sma50)
+        return SIGNAL_DISPLAY[signals.HOLD if code is None else code]
     
     def update_plot(self):
         try:
-            if len(self.price_data) > 0:
-                self.price_ax.clear()
-                self.rsi_ax.clear()
-
-                # Set dark mode colors
-                self.price_ax.set_facecolor(self.bg_color)
-                self.rsi_ax.set_facecolor(self.bg_color)
-                self.figure.set_facecolor(self.bg_color)
-
-                # Configure text colors
-                self.price_ax.tick_params(colors=self.text_color)
-                self.rsi_ax.tick_params(colors=self.text_color)
-                
-                # Plot data
-                self.price_ax.plot(self.times_data, self.price_data, 
-                                label='BTC/EUR', color='#17BECF')
-                
-                if len(self.sma20_data) > 0:
-                    self.price_ax.plot(
-                        self.times_data[-len(self.sma20_data):],
-                        self.sma20_data, label='SMA20', color='#7F7F7F')
-                    self.price_ax.plot(
-                        self.times_data[-len(self.sma50_data):],
-                        self.sma50_data, label='SMA50', color='#FFB6C1')
-
-                if len(self.rsi_data) > 0:
-                    self.rsi_ax.plot(
-                        self.times_data[-len(self.rsi_data):],
-                        self.rsi_data, label='RSI', color='#9467BD')
-                    self.rsi_ax.axhline(y=70, color='#ff4444', linestyle='--')
-                    self.rsi_ax.axhline(y=30, color='#00ff00', linestyle='--')
-
-                # Customize plots
-                self.price_ax.set_title('Bitcoin Price (EUR)', pad=10, color=self.text_color)
-                self.price_ax.set_ylabel('Price (EUR)', color=self.text_color)
-                self.price_ax.grid(True, alpha=0.3, color=self.text_color)
-                self.price_ax.legend(loc='upper left', facecolor=self.bg_color, labelcolor=self.text_color)
-
-                self.rsi_ax.set_title('RSI Indicator', pad=10, color=self.text_color)
-                self.rsi_ax.set_ylabel('RSI', color=self.text_color)
-                self.rsi_ax.set_ylim(0, 100)
-                self.rsi_ax.grid(True, alpha=0.3, color=self.text_color)
-                self.rsi_ax.legend(loc='upper left', facecolor=self.bg_color, labelcolor=self.text_color)
-
-                # Update spines colors
-                for spine in self.price_ax.spines.values():
-                    spine.set_color(self.text_color)
-                for spine in self.rsi_ax.spines.values():
-                    spine.set_color(self.text_color)
-
-                self.price_ax.tick_params(axis='x', rotation=45)
-                self.rsi_ax.tick_params(axis='x', rotation=45)
-
-                self.figure.tight_layout()
-                self.canvas.draw()
-
+            view = self.chart_view.get()
+            with self.data_lock:
+                # A copy, so the worker can keep appending while the chart draws
+                if view == 'Ticks':
+                    source, series = self.series, self.series.copy()
+                else:
+                    source, series = self.candles, self.candles[view].copy()
+            with metrics.STAGE_SECONDS.labels('render').time():
+                # Keyed on the buffer too: warm_start swaps in a new aggregator
+                # whose versions restart and could match the last drawn one
+                self.chart.update(series, (view, source))
         except Exception as e:
             print(f"Error in plot update: {e}")
 
@@ -280,85 +289,151 @@ class BitcoinTracker(tk.Tk):
 
     def get_bitcoin_data(self):
         try:
-            url = "https://api.binance.com/api/v3/ticker/price?symbol=BTCEUR"
-            response = requests.get(url, timeout=5)
-            data = response.json()
-            return float(data['price'])
+            with metrics.STAGE_SECONDS.labels('fetch').time():
+                return self.price_client.get_quote()
+        except PriceUnavailable as e:
+            metrics.FETCH_ERRORS.inc()
+            print(f"Error getting price data: {e}")
+            return None
+
+    def collect_data(self):
+        # Warm up on this thread, so the window comes up at once even when the API is slow
+        try:
+            self.warm_start()
         except Exception as e:
-            try:
-                url = "https://api.binance.com/api/v3/ticker/price?symbol=BTCUSDT"
-                response = requests.get(url, timeout=5)
-                data = response.json()
-                price_usdt = float(data['price'])
-                return price_usdt * 0.92
-            except Exception as e:
-                print(f"Error getting price data: {e}")
-                return None
+            print(f"Error warming up price history: {e}")
+        if not self.running:
+            return
+        if PRICE_FEED == 'stream':
+            self.price_stream = PriceStream(
+                self.on_stream_price,
+                min_interval=STREAM_MIN_INTERVAL,
+                on_gap=self.on_stream_gap
+            )
+            self.price_stream.start()
+        else:
+            self.update_data()
+
+    def warm_start(self):
+        # Replay recent ticks from the previous run, topped up with historical
+        # candles, so the signal is available immediately
+        ticks = self.tick_store.recent(MAX_DATA_POINTS)
+        candles = CandleAggregator()
+        try:
+            candles.seed_history(self.backfiller, PRIMARY_SYMBOL)
+            if PRICE_FEED == 'rest':
+                # Streamed ticks have no fixed cadence to sample history at
+                ticks = seed_history(ticks, MAX_DATA_POINTS, self.backfiller, POLL_INTERVAL_SECONDS)
+        except Exception as e:
+            print(f"Error backfilling price history: {e}")
+        with self.data_lock:
+            self.candles = candles
+        for timestamp, price in ticks:
+            self.record_price(price, timestamp)
+        if ticks:
+            self.ui.publish(self.tick_snapshot(None))
+
+    def record_price(self, current_price, timestamp):
+        # Check if day has changed
+        current_date = timestamp.date()
+        if current_date != self.last_reset:
+            self.daily_high = current_price
+            self.daily_low = current_price
+            self.last_reset = current_date
+
+        # Update daily high/low and append data
+        self.daily_high = max(self.daily_high, current_price)
+        self.daily_low = min(self.daily_low, current_price)
+        self.all_time_high = max(self.all_time_high, current_price)
+        
+        # Append new data
+        with self.data_lock:
+            with metrics.STAGE_SECONDS.labels('indicators').time():
+                rsi, sma20, sma50 = self.indicators.update(current_price)
+                self.series.append(timestamp, price=current_price,
+                                   rsi=rsi, sma20=sma20, sma50=sma50)
+            with metrics.STAGE_SECONDS.labels('candles').time():
+                self.candles.add(timestamp, current_price)
+
+    def process_price(self, current_price, timestamp, conversion=None):
+        received_at = time.perf_counter()
+        metrics.TICKS.inc()
+        self.record_price(current_price, timestamp)
+        self.price_conversion = conversion
+        with metrics.STAGE_SECONDS.labels('persist').time():
+            self.tick_store.append(timestamp, current_price, conversion)
+        self.ui.publish(self.tick_snapshot(received_at))
+
+    def tick_snapshot(self, received_at):
+        """Copies what the widgets show, so the Tk thread never reads state the worker is changing."""
+        series = self.series
+        return TickSnapshot(
+            price=series.last('price'),
+            daily_high=self.daily_high,
+            daily_low=self.daily_low,
+            all_time_high=self.all_time_high,
+            rsi=series.last('rsi'),
+            sma20=series.last('sma20'),
+            sma50=series.last('sma50'),
+            ready=len(series) > 50,
+            rows=(series.times()[-TEXT_ROWS:].copy(),) + tuple(
+                series[name][-TEXT_ROWS:].copy() for name in ('price', 'rsi', 'sma20', 'sma50')),
+            appended=series.appended,
+            received_at=received_at,
+        )
+
+    def update_displays(self, snapshot):
+        """Runs on the Tk thread with the newest snapshot (see ui_dispatch.py)."""
+        current_price = snapshot.price
+        if snapshot.ready:
+            signal, color = self.generate_trading_signal(
+                snapshot.rsi, current_price, snapshot.sma20, snapshot.sma50
+            )
+            self.signal_label.config(text=signal, fg=color)
+
+        # Update labels
+        self.current_price_label.config(
+            text=f"Current Price: {current_price:,.2f} EUR"
+        )
+        self.high_price_label.config(
+            text=f"Daily High: {snapshot.daily_high:,.2f} EUR | ATH: {snapshot.all_time_high:,.2f} EUR"
+        )
+        self.low_price_label.config(
+            text=f"Daily Low: {snapshot.daily_low:,.2f} EUR"
+        )
+
+        # Update text displays
+        self.update_text_widgets(snapshot.rows, snapshot.appended)
+        if snapshot.received_at is not None:
+            metrics.TICK_TO_SCREEN_SECONDS.observe(time.perf_counter() - snapshot.received_at)
 
     def update_data(self):
         while self.running:
             try:
-                current_price = self.get_bitcoin_data()
+                quote = self.get_bitcoin_data()
                 
-                if current_price:
-                    # Check if day has changed
-                    current_date = datetime.now().date()
-                    if current_date != self.last_reset:
-                        self.daily_high = current_price
-                        self.daily_low = current_price
-                        self.last_reset = current_date
-
-                    # Update daily high/low and append data
-                    self.daily_high = max(self.daily_high, current_price)
-                    self.daily_low = min(self.daily_low, current_price)
-                    self.all_time_high = max(self.all_time_high, current_price)
-                    
-                    # Append new data
-                    self.price_data.append(current_price)
-                    self.times_data.append(datetime.now())
-
-                    if len(self.price_data) > 50:
-                        prices_array = np.array(self.price_data)
-                        rsi = talib.RSI(prices_array, timeperiod=14)[-1]
-                        sma20 = talib.SMA(prices_array, timeperiod=20)[-1]
-                        sma50 = talib.SMA(prices_array, timeperiod=50)[-1]
-
-                        self.rsi_data.append(rsi)
-                        self.sma20_data.append(sma20)
-                        self.sma50_data.append(sma50)
-
-                        signal, color = self.generate_trading_signal(
-                            rsi, current_price, sma20, sma50
-                        )
-                        self.signal_label.config(text=signal, fg=color)
-
-                        if len(self.price_data) > 300:
-                            self.price_data.pop(0)
-                            self.times_data.pop(0)
-                            self.rsi_data.pop(0)
-                            self.sma20_data.pop(0)
-                            self.sma50_data.pop(0)
-
-                    # Update labels
-                    self.current_price_label.config(
-                        text=f"Current Price: {current_price:,.2f} EUR"
-                    )
-                    self.high_price_label.config(
-                        text=f"Daily High: {self.daily_high:,.2f} EUR | ATH: {self.all_time_high:,.2f} EUR"
-                    )
-                    self.low_price_label.config(
-                        text=f"Daily Low: {self.daily_low:,.2f} EUR"
-                    )
-
-                    # Update text displays
-                    self.update_text_widgets()
-
-                time.sleep(1)
+                if quote:
+                    self.process_price(quote.price, datetime.now(), quote.conversion)
+
+                time.sleep(POLL_INTERVAL_SECONDS)
 
             except Exception as e:
                 print(f"Error in data update: {e}")
                 time.sleep(5)
 
+    def on_stream_price(self, price, timestamp):
+        try:
+            self.process_price(price, timestamp)
+        except Exception as e:
+            print(f"Error in data update: {e}")
+
+    def on_stream_gap(self, missed):
+        if missed is None:
+            print("Price stream reconnected; ticks may have been missed")
+        else:
+            metrics.TICKS_DROPPED.inc(missed)
+            print(f"Price stream gap: {missed} trades missed")
+
     def add_buttons(self):
         # Create button frame
         self.button_frame = tk.Frame(self.signal_frame, bg=self.bg_color)
@@ -400,10 +475,24 @@ class BitcoinTracker(tk.Tk):
         )
         self.fullscreen_button.pack(side=tk.LEFT, padx=10)
 
+        # Metrics button
+        self.metrics_button = tk.Button(
+            self.button_frame,
+            text="Metrics",
+            command=lambda: MetricsWindow(self),
+            bg='#404040',
+            fg='white',
+            font=('Arial', 14, 'bold'),
+            width=15
+        )
+        self.metrics_button.pack(side=tk.LEFT, padx=10)
+
 
     def open_purchase_window(self):
-        if len(self.price_data) > 0:
-            PurchaseWindow(self, self.price_data[-1])
+        with self.data_lock:
+            price = self.series.last('price') if len(self.series) > 0 else None
+        if price is not None:
+            PurchaseWindow(self, price, self.price_conversion)
 
     def toggle_fullscreen(self):
         if self.attributes('-fullscreen'):
@@ -416,11 +505,15 @@ class BitcoinTracker(tk.Tk):
 
     def on_closing(self):
         self.running = False
+        self.ui.stop()
+        if self.price_stream is not None:
+            self.price_stream.stop()
         time.sleep(1)
+        self.tick_store.close()
         self.destroy()
 
 class PurchaseWindow(tk.Toplevel):
-    def __init__(self, parent, current_price):
+    def __init__(self, parent, current_price, conversion=None):
         super().__init__(parent)
         self.title("Purchase Bitcoin")
         self.geometry("500x400")
@@ -433,6 +526,7 @@ class PurchaseWindow(tk.Toplevel):
         # Store parent reference and price
         self.parent = parent
         self.current_price = current_price
+        self.conversion = conversion
         
         # Create labels
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -491,20 +585,11 @@ class PurchaseWindow(tk.Toplevel):
             timestamp = datetime.now()
             
             # Save to database
-            conn = sqlite3.connect('bitcoin_purchases.db')
-            c = conn.cursor()
-            
-            # Create table if it doesn't exist
-            c.execute('''CREATE TABLE IF NOT EXISTS purchases
-                        (timestamp TEXT, price REAL, eur_amount REAL, btc_amount REAL)''')
-            
-            # Insert purchase data
-            c.execute("INSERT INTO purchases VALUES (?, ?, ?, ?)",
-                     (timestamp.strftime("%Y-%m-%d %H:%M:%S"), 
-                      self.current_price, amount, btc_amount))
-            
-            conn.commit()
-            conn.close()
+            with metrics.DB_SECONDS.labels('purchase_insert').time(), purchases_db.transaction() as conn:
+                conn.execute(
+                    SQL_INSERT_PURCHASE,
+                    (timestamp.strftime("%Y-%m-%d %H:%M:%S"), int(timestamp.timestamp()),
+                     self.current_price, amount, btc_amount, self.conversion))
             
             # Show purchases window
             PurchasesListWindow(self.parent)
@@ -574,7 +659,7 @@ class PurchasesListWindow(tk.Toplevel):
             columns=columns, 
             show='headings',
             style="Custom.Treeview",
-            yscrollcommand=self.scrollbar.set
+            yscrollcommand=self.on_tree_scroll
         )
         
         # Configure scrollbar
@@ -607,9 +692,18 @@ class PurchasesListWindow(tk.Toplevel):
         # Create a frame for totals
         self.totals_frame = tk.Frame(self, bg='#1e1e1e')
         self.totals_frame.pack(pady=20, padx=20, fill=tk.X)
+        self.create_totals_labels()
 
-        # Load purchases and calculate totals
-        self.load_purchases()
+        # Row colors
+        self.tree.tag_configure('evenrow', background='#2d2d2d')
+        self.tree.tag_configure('oddrow', background='#363636')
+
+        # Totals come from one aggregate query; rows are paged in newest
+        # first, and later refreshes only fetch rows past last_rowid
+        self.older_cursor = None
+        self.has_older = False
+        self.load_totals()
+        self.load_older_purchases()
 
         # Update cycle
         self.update_pl_values()
@@ -621,102 +715,160 @@ class PurchasesListWindow(tk.Toplevel):
         y = (screen_height/2) - (height/2)
         self.geometry(f'{width}x{height}+{int(x)}+{int(y)}')
 
-    def load_purchases(self, current_btc_price=None):
-        try:
-            if current_btc_price is None:
-                current_btc_price = self.parent.price_data[-1] if len(self.parent.price_data) > 0 else 0
-
-            conn = sqlite3.connect('bitcoin_purchases.db')
-            c = conn.cursor()
-            
-            c.execute("SELECT * FROM purchases ORDER BY timestamp DESC")
-            rows = c.fetchall()
-            
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            total_eur = 0
-            total_btc = 0
-            total_current_value = 0
-            
-            for i, row in enumerate(rows):
-                total_eur += row[2]  # EUR amount
-                total_btc += row[3]  # BTC amount
-                
-                # Calculate current value
-                current_value = row[3] * current_btc_price
-                total_current_value += current_value
-                
-                tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-                self.tree.insert("", tk.END, values=(
-                    row[0],
-                    f"{row[1]:.2f} EUR",
-                    f"{row[2]:.2f} EUR",
-                    f"{row[3]:.8f} BTC"
-                ), tags=(tag,))
-            
-            # Configure tag colors
-            self.tree.tag_configure('evenrow', background='#2d2d2d')
-            self.tree.tag_configure('oddrow', background='#363636')
-
-            # Update totals frame with real-time P/L
-            for widget in self.totals_frame.winfo_children():
-                widget.destroy()
-
-            # Calculate total profit/loss
-            total_pl = total_current_value - total_eur
-            pl_percentage = (total_pl / total_eur * 100) if total_eur > 0 else 0
-            pl_color = '#00ff00' if total_pl >= 0 else '#ff4444'
-
-            tk.Label(
+    def create_totals_labels(self):
+        self.total_labels = {}
+        for name in ('invested', 'btc', 'value', 'pl'):
+            label = tk.Label(
                 self.totals_frame,
-                text=f"Total Invested: {total_eur:.2f} EUR",
                 font=('Arial', 12, 'bold'),
                 bg='#1e1e1e',
                 fg='white'
-            ).pack(side=tk.LEFT, padx=20)
+            )
+            label.pack(side=tk.LEFT, padx=20)
+            self.total_labels[name] = label
 
-            tk.Label(
-                self.totals_frame,
-                text=f"Total BTC: {total_btc:.8f} BTC",
-                font=('Arial', 12, 'bold'),
-                bg='#1e1e1e',
-                fg='white'
-            ).pack(side=tk.LEFT, padx=20)
+    def load_totals(self):
+        try:
+            with metrics.DB_SECONDS.labels('purchase_totals').time(), purchases_db.connection() as conn:
+                self.total_eur, self.total_btc, self.last_rowid = conn.execute(
+                    "SELECT COALESCE(SUM(eur_amount), 0), COALESCE(SUM(btc_amount), 0), "
+                    "COALESCE(MAX(rowid), 0) FROM purchases"
+                ).fetchone()
+        except Exception as e:
+            print(f"Error loading purchase totals: {e}")
+            self.total_eur, self.total_btc, self.last_rowid = 0.0, 0.0, 0
+
+    def insert_purchase_row(self, row, index):
+        tag = 'evenrow' if row[0] % 2 == 0 else 'oddrow'
+        self.tree.insert("", index, values=(
+            row[1],
+            f"{row[2]:.2f} EUR",
+            f"{row[3]:.2f} EUR",
+            f"{row[4]:.8f} BTC"
+        ), tags=(tag,))
+
+    def load_older_purchases(self):
+        # Keyset pagination: the next page starts below the last row shown
+        try:
+            with metrics.DB_SECONDS.labels('purchases_page').time(), purchases_db.connection() as conn:
+                if self.older_cursor is None:
+                    rows = conn.execute(
+                        SQL_PURCHASES_PAGE,
+                        (self.last_rowid, PURCHASES_PAGE_SIZE + 1)
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        SQL_PURCHASES_OLDER_PAGE,
+                        (*self.older_cursor, self.last_rowid, PURCHASES_PAGE_SIZE + 1)
+                    ).fetchall()
+
+            self.has_older = len(rows) > PURCHASES_PAGE_SIZE
+            rows = rows[:PURCHASES_PAGE_SIZE]
+            for row in rows:
+                self.insert_purchase_row(row, tk.END)
+            if rows:
+                self.older_cursor = (rows[-1][5], rows[-1][0])
 
-            tk.Label(
-                self.totals_frame,
-                text=f"Current Value: {total_current_value:.2f} EUR",
-                font=('Arial', 12, 'bold'),
-                bg='#1e1e1e',
-                fg='white'
-            ).pack(side=tk.LEFT, padx=20)
+        except Exception as e:
+            print(f"Error loading purchases: {e}")
 
-            tk.Label(
-                self.totals_frame,
-                text=f"P/L: {total_pl:+.2f} EUR ({pl_percentage:+.2f}%)",
-                font=('Arial', 12, 'bold'),
-                bg='#1e1e1e',
-                fg=pl_color
-            ).pack(side=tk.LEFT, padx=20)
+    def load_new_purchases(self):
+        try:
+            with metrics.DB_SECONDS.labels('purchases_new').time(), purchases_db.connection() as conn:
+                rows = conn.execute(
+                    "SELECT rowid, timestamp, price, eur_amount, btc_amount FROM purchases "
+                    "WHERE rowid > ? ORDER BY rowid",
+                    (self.last_rowid,)
+                ).fetchall()
             
-            conn.close()
+            for row in rows:
+                self.total_eur += row[3]  # EUR amount
+                self.total_btc += row[4]  # BTC amount
+                
+                # Newest purchases go on top
+                self.insert_purchase_row(row, 0)
+                self.last_rowid = row[0]
             
         except Exception as e:
             print(f"Error loading purchases: {e}")
 
+    def on_tree_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Fetch the next page once the user scrolls to the bottom
+        if self.has_older and float(last) >= 1.0:
+            self.has_older = False
+            self.after_idle(self.load_older_purchases)
+
+    def update_totals(self, current_btc_price):
+        # Calculate total profit/loss from the running sums
+        total_current_value = self.total_btc * current_btc_price
+        total_pl = total_current_value - self.total_eur
+        pl_percentage = (total_pl / self.total_eur * 100) if self.total_eur > 0 else 0
+        pl_color = '#00ff00' if total_pl >= 0 else '#ff4444'
+
+        self.total_labels['invested'].config(text=f"Total Invested: {self.total_eur:.2f} EUR")
+        self.total_labels['btc'].config(text=f"Total BTC: {self.total_btc:.8f} BTC")
+        self.total_labels['value'].config(text=f"Current Value: {total_current_value:.2f} EUR")
+        self.total_labels['pl'].config(
+            text=f"P/L: {total_pl:+.2f} EUR ({pl_percentage:+.2f}%)", fg=pl_color)
+
 
     def update_pl_values(self):
         try:
-            current_btc_price = self.parent.price_data[-1] if len(self.parent.price_data) > 0 else 0
-            self.load_purchases()  # Remove the parameter here
+            with self.parent.data_lock:
+                current_btc_price = self.parent.series.last('price', 0)
+            self.load_new_purchases()
+            self.update_totals(current_btc_price)
             # Schedule next update in 1 second
             self.after(1000, self.update_pl_values)
         except Exception as e:
             print(f"Error updating P/L: {e}")
 
 
+class MetricsWindow(tk.Toplevel):
+    """Debug panel with the pipeline timings and counters from metrics.py, refreshed every second."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.title("Metrics")
+        self.configure(bg='#1e1e1e')
+        self.resizable(True, True)
+        self.center_window(820, 420)
+
+        self.text = tk.Text(self, bg='#1e1e1e', fg='white', font=('Courier', 10), wrap=tk.NONE)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.refresh()
+
+    def center_window(self, width, height):
+        screen_width = self.winfo_screenwidth()
+        screen_height = self.winfo_screenheight()
+        x = (screen_width/2) - (width/2)
+        y = (screen_height/2) - (height/2)
+        self.geometry(f'{width}x{height}+{int(x)}+{int(y)}')
+
+    def refresh(self):
+        if not metrics.ENABLED:
+            content = "Metrics are disabled. Start the app with BTC_METRICS=1 to time the pipeline stages.\n"
+        else:
+            content = self.format_summary(self.parent.metrics_server)
+        self.text.delete('1.0', tk.END)
+        self.text.insert(tk.END, content)
+        if metrics.ENABLED:
+            self.after(METRICS_REFRESH_MS, self.refresh)
+
+    @staticmethod
+    def format_summary(server):
+        lines = [f"{'Metric':<34}{'Label':<16}{'Count':>8}{'Mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'Max ms':>10}"]
+        for name, label, count, *timings in metrics.summary():
+            cells = ''.join(f"{'' if t is None else f'{t:.2f}':>10}" for t in timings)
+            lines.append(f"{name:<34}{label or '':<16}{count:>8}{cells}")
+        if server is not None:
+            host, port = server.server_address[:2]
+            lines.append(f"\nPrometheus: http://{host}:{port}/metrics")
+        return '\n'.join(lines) + '\n'
+
+
 if __name__ == "__main__":
     app = BitcoinTracker()
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
@@ -0,0 +1,285 @@
+"""Historical kline (candlestick) backfill with a local SQLite cache.
+
+Candles are cached per (symbol, interval, open_time). A backfill first looks
+at which candles of the requested range are already cached and only
+downloads the missing runs, split into pages of at most PAGE_LIMIT candles
+that are fetched concurrently. Request weight is tracked from Binance's
+``X-MBX-USED-WEIGHT-1M`` header and requests pause before the per-minute
+budget runs out; 429/418 answers are retried after ``Retry-After``.
+
+Only closed candles are cached, so a cached range never changes. The fetcher
+is any callable ``fetch(symbol, interval, start_ms, end_ms, limit)`` that
+returns Binance kline arrays, so tests can replay recorded responses with
+FixtureFetcher instead of hitting the API.
+
+    python backfill.py BTCEUR 1h --days 30 [--record fixture.json]
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import requests
+
+from db import ConnectionPool
+from migrations import KLINES_MIGRATIONS, migrate
+from price_client import BINANCE_API_URL, PRIMARY_SYMBOL, backoff_delay
+
+KLINES_DB = 'bitcoin_klines.db'
+KLINES_PATH = "/api/v3/klines"
+PAGE_LIMIT = 1000
+MAX_WORKERS = 4
+KLINES_WEIGHT = 2
+# Binance allows 6000 weight per minute per IP; leave room for the live ticker
+WEIGHT_LIMIT_PER_MINUTE = 3000
+# Candles used to seed the live tick series, sampled at the caller's tick cadence
+SEED_INTERVAL = '1s'
+# Seeding runs at startup: one short attempt per request, so an unreachable
+# API delays the first live tick by seconds rather than minutes
+SEED_TIMEOUT = 3
+
+INTERVAL_MS = {
+    '1s': 1000,
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000,
+    '1d': 86_400_000, '3d': 259_200_000, '1w': 604_800_000,
+}
+
+SQL_STORE_KLINE = ("INSERT OR REPLACE INTO klines "
+                   "(symbol, interval, open_time, open, high, low, close, volume) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_CACHED_OPEN_TIMES = ("SELECT open_time FROM klines "
+                         "WHERE symbol = ? AND interval = ? AND open_time BETWEEN ? AND ?")
+SQL_LOAD_KLINES = ("SELECT open_time, open, high, low, close, volume FROM klines "
+                   "WHERE symbol = ? AND interval = ? AND open_time BETWEEN ? AND ? "
+                   "ORDER BY open_time")
+
+
+class RateLimiter:
+    """Client-side view of the exchange's per-minute request weight."""
+
+    def __init__(self, limit_per_minute=WEIGHT_LIMIT_PER_MINUTE):
+        self.limit = limit_per_minute
+        self._used = 0
+        self._window = self._current_window()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _current_window():
+        return int(time.time() // 60)
+
+    def acquire(self, weight):
+        """Blocks until ``weight`` fits into the current minute's budget."""
+        while True:
+            with self._lock:
+                if self._current_window() != self._window:
+                    self._window = self._current_window()
+                    self._used = 0
+                if self._used + weight <= self.limit:
+                    self._used += weight
+                    return
+                wait = 60 - time.time() % 60
+            time.sleep(wait)
+
+    def update(self, used_weight):
+        """Syncs with the weight the exchange reports as used this minute."""
+        with self._lock:
+            self._used = max(self._used, used_weight)
+
+
+class BinanceKlineFetcher:
+    def __init__(self, base_url=BINANCE_API_URL, timeout=10, retries=3, limiter=None):
+        self.url = f"{base_url.rstrip('/')}{KLINES_PATH}"
+        self.timeout = timeout
+        self.retries = retries
+        self.limiter = limiter or RateLimiter()
+        self.session = requests.Session()
+
+    def __call__(self, symbol, interval, start_ms, end_ms, limit=PAGE_LIMIT):
+        params = {'symbol': symbol, 'interval': interval,
+                  'startTime': start_ms, 'endTime': end_ms, 'limit': limit}
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(KLINES_WEIGHT)
+            try:
+                response = self.session.get(self.url, params=params, timeout=self.timeout)
+                used = response.headers.get('X-MBX-USED-WEIGHT-1M')
+                if used is not None:
+                    self.limiter.update(int(used))
+                if response.status_code in (418, 429):
+                    # Rate limited (418 = IP banned for repeating it); honour Retry-After
+                    retry_after = float(response.headers.get('Retry-After', 60))
+                    if attempt == self.retries:
+                        response.raise_for_status()
+                    time.sleep(retry_after)
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except requests.exceptions.RequestException as e:
+                if attempt == self.retries or getattr(e.response, 'status_code', None) in (418, 429):
+                    raise
+                time.sleep(backoff_delay(attempt, base=0.5, cap=5.0))
+
+
+class FixtureFetcher:
+    """Serves recorded kline arrays as if they came from the API."""
+
+    def __init__(self, klines):
+        self.klines = sorted(klines, key=lambda k: k[0])
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def __call__(self, symbol, interval, start_ms, end_ms, limit=PAGE_LIMIT):
+        self.calls += 1
+        return [k for k in self.klines if start_ms <= k[0] <= end_ms][:limit]
+
+
+class KlineCache:
+    def __init__(self, db_name=KLINES_DB):
+        self.pool = ConnectionPool(db_name, size=1)
+        with self.pool.connection() as conn:
+            migrate(conn, KLINES_MIGRATIONS)
+
+    def store(self, symbol, interval, klines):
+        rows = [(symbol, interval, int(k[0]), float(k[1]), float(k[2]), float(k[3]),
+                 float(k[4]), float(k[5])) for k in klines]
+        with self.pool.transaction() as conn:
+            conn.executemany(SQL_STORE_KLINE, rows)
+
+    def open_times(self, symbol, interval, start_ms, end_ms):
+        with self.pool.connection() as conn:
+            rows = conn.execute(SQL_CACHED_OPEN_TIMES, (symbol, interval, start_ms, end_ms)).fetchall()
+        return np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+
+    def load(self, symbol, interval, start_ms, end_ms):
+        """Returns cached (open_time, open, high, low, close, volume) rows, oldest first."""
+        with self.pool.connection() as conn:
+            return conn.execute(SQL_LOAD_KLINES, (symbol, interval, start_ms, end_ms)).fetchall()
+
+    def close(self):
+        self.pool.close()
+
+
+def missing_pages(cached, start_ms, end_ms, step, page_limit=PAGE_LIMIT):
+    """Splits the uncached candles of [start_ms, end_ms] into (start, end) request pages."""
+    expected = np.arange(start_ms, end_ms + 1, step, dtype=np.int64)
+    missing = np.setdiff1d(expected, cached, assume_unique=True)
+    if missing.size == 0:
+        return []
+    # Break into contiguous runs, then into pages of at most page_limit candles
+    breaks = np.flatnonzero(np.diff(missing) != step) + 1
+    pages = []
+    for run in np.split(missing, breaks):
+        for i in range(0, run.size, page_limit):
+            chunk = run[i:i + page_limit]
+            pages.append((int(chunk[0]), int(chunk[-1])))
+    return pages
+
+
+class Backfiller:
+    def __init__(self, cache=None, fetcher=None, max_workers=MAX_WORKERS):
+        self.cache = cache or KlineCache()
+        self.fetcher = fetcher or BinanceKlineFetcher()
+        self.max_workers = max_workers
+
+    def backfill(self, symbol, interval, start_ms, end_ms):
+        """Downloads the closed candles of the range that are not cached yet.
+
+        Returns the number of candles stored.
+        """
+        step = INTERVAL_MS[interval]
+        start_ms = -(-start_ms // step) * step
+        # The newest closed candle opened one interval before the current one
+        end_ms = min(end_ms, int(time.time() * 1000) // step * step - step)
+        if end_ms < start_ms:
+            return 0
+
+        cached = self.cache.open_times(symbol, interval, start_ms, end_ms)
+        pages = missing_pages(cached, start_ms, end_ms, step)
+        if not pages:
+            return 0
+
+        stored = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="backfill") as executor:
+            futures = [executor.submit(self.fetcher, symbol, interval, start, end, PAGE_LIMIT)
+                       for start, end in pages]
+            # Store pages as they arrive; the cache connection stays on this thread
+            for future in as_completed(futures):
+                klines = [k for k in future.result() if int(k[0]) <= end_ms]
+                if klines:
+                    self.cache.store(symbol, interval, klines)
+                    stored += len(klines)
+        return stored
+
+    def candles(self, symbol, interval, start_ms, end_ms):
+        self.backfill(symbol, interval, start_ms, end_ms)
+        return self.cache.load(symbol, interval, start_ms, end_ms)
+
+    def recent_closes(self, symbol, interval, count, end=None):
+        """Returns the last ``count`` closed candles before ``end`` as (datetime, close), oldest first."""
+        step = INTERVAL_MS[interval]
+        # Open time of the last candle that closed before ``end``
+        end_ms = int((end or datetime.now()).timestamp() * 1000) // step * step - step
+        rows = self.candles(symbol, interval, end_ms - (count - 1) * step, end_ms)
+        return [(datetime.fromtimestamp(r[0] / 1000), r[4]) for r in rows[-count:]]
+
+
+def startup_backfiller():
+    """Backfiller for seeding at startup, with SEED_TIMEOUT and no retries."""
+    return Backfiller(fetcher=BinanceKlineFetcher(timeout=SEED_TIMEOUT, retries=0))
+
+
+def seed_history(ticks, count, backfiller, cadence, symbol=PRIMARY_SYMBOL):
+    """Prepends historical prices to stored (timestamp, price) ticks until there are ``count``.
+
+    The prices are SEED_INTERVAL closes taken every ``cadence`` seconds, the
+    caller's tick interval, so the indicators see a single timeframe. A
+    cadence that is not a whole number of seconds (stream mode) has no
+    matching candles and leaves the ticks unchanged. Backfill errors are
+    raised; callers carry on without history.
+    """
+    needed = count - len(ticks)
+    if needed <= 0 or cadence < 1 or cadence % 1:
+        return ticks
+    step = int(cadence)
+    history = backfiller.recent_closes(symbol, SEED_INTERVAL, needed * step,
+                                       end=ticks[0][0] if ticks else None)
+    # Keep the newest close and every step-th one before it
+    return history[(len(history) - 1) % step::step] + ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical klines into the local cache.")
+    parser.add_argument('symbol')
+    parser.add_argument('interval', choices=sorted(INTERVAL_MS, key=INTERVAL_MS.get))
+    parser.add_argument('--days', type=float, default=1.0)
+    parser.add_argument('--db', default=KLINES_DB)
+    parser.add_argument('--record', metavar='PATH',
+                        help="also write the range as a JSON fixture for FixtureFetcher")
+    args = parser.parse_args()
+
+    end_ms = int(time.time() * 1000)
+    start_ms = end_ms - int(args.days * 86_400_000)
+    backfiller = Backfiller(KlineCache(args.db))
+    started = time.perf_counter()
+    stored = backfiller.backfill(args.symbol, args.interval, start_ms, end_ms)
+    print(f"Stored {stored} new {args.symbol} {args.interval} candles "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    if args.record:
+        rows = backfiller.cache.load(args.symbol, args.interval, start_ms, end_ms)
+        with open(args.record, 'w') as f:
+            json.dump([list(r) for r in rows], f)
+        print(f"Wrote {len(rows)} candles to {args.record}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Vectorized backtest of the trading signal rules.
+
+Indicators, signals, positions and equity are computed over whole NumPy
+arrays, so years of minute candles take seconds instead of a replay through
+the streaming indicators. The wallet follows the same EUR/BTC balance model
+as the Streamlit wallet tab: a buy turns the whole EUR balance into BTC at the
+candle's close, a sell turns all BTC back into EUR, and every fill pays
+``fee`` of its value.
+
+    python backtest.py --interval 1m --days 365 [--fee 0.001] [--strong-only]
+"""
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import signals
+from backfill import INTERVAL_MS, Backfiller
+from price_client import PRIMARY_SYMBOL
+
+DEFAULT_FEE = 0.001          # 0.1% per fill, Binance's base spot fee
+DEFAULT_INITIAL_EUR = 1000.0
+
+BacktestResult = namedtuple('BacktestResult', [
+    'final_equity',
+    'pl_eur',
+    'pl_pct',
+    'buy_and_hold_pct',
+    'max_drawdown_pct',
+    'realized_pl',
+    'fees_eur',
+    'buys',
+    'sells',
+    'win_rate',          # share of closed round trips that made money
+    'exposure_pct',      # share of candles spent holding BTC
+    'equity',            # equity curve in EUR, one value per candle
+])
+
+
+def compute_indicators(prices, rsi_period=14, sma20_period=20, sma50_period=50):
+    prices = np.asarray(prices, dtype=float)
+    return indicators.IndicatorValues(
+        indicators.rsi(prices, rsi_period),
+        indicators.sma(prices, sma20_period),
+        indicators.sma(prices, sma50_period),
+    )
+
+
+def positions(codes, min_strength=1):
+    """1 while holding BTC, 0 while in EUR, for each candle after its signal."""
+    target = np.full(codes.shape, np.nan)
+    target[codes >= min_strength] = 1.0
+    target[codes <= -min_strength] = 0.0
+    return pd.Series(target).ffill().fillna(0.0).to_numpy()
+
+
+def run_backtest(prices, rules=signals.DEFAULT_RULES, fee=DEFAULT_FEE,
+                 initial_eur=DEFAULT_INITIAL_EUR, min_strength=1, values=None):
+    """Backtests the signal rules over a price array.
+
+    ``min_strength=2`` trades only the strong signals. ``values`` takes
+    precomputed IndicatorValues, so sweeps over rule thresholds do not
+    recompute the indicators.
+    """
+    prices = np.asarray(prices, dtype=float)
+    if prices.size < 2:
+        raise ValueError("need at least two prices to backtest")
+    rsi, sma20, sma50 = values if values is not None else compute_indicators(prices)
+    codes = signals.classify_array(rsi, prices, sma20, sma50, rules)
+    held = positions(codes, min_strength)
+
+    previous = np.concatenate(([0.0], held[:-1]))
+    trades = held != previous
+    growth = np.ones_like(prices)
+    growth[1:] = np.where(previous[1:] == 1.0, prices[1:] / prices[:-1], 1.0)
+    growth[trades] *= 1.0 - fee
+    equity = initial_eur * np.cumprod(growth)
+
+    # Value just before each fill's fee; a buy spends it, a sell receives it
+    gross = equity[trades] / (1.0 - fee)
+    buy_values = gross[held[trades] == 1.0]
+    sell_values = gross[held[trades] == 0.0] * (1.0 - fee)
+    # Every sell closes the buy before it (all-in/all-out)
+    round_trips = sell_values - buy_values[:sell_values.size]
+
+    peak = np.maximum.accumulate(equity)
+    final = float(equity[-1])
+    return BacktestResult(
+        final_equity=final,
+        pl_eur=final - initial_eur,
+        pl_pct=100.0 * (final / initial_eur - 1.0),
+        buy_and_hold_pct=100.0 * (prices[-1] / prices[0] - 1.0),
+        max_drawdown_pct=100.0 * float(np.min(equity / peak - 1.0)),
+        realized_pl=float(round_trips.sum()),
+        fees_eur=float(gross.sum() * fee),
+        buys=int(buy_values.size),
+        sells=int(sell_values.size),
+        win_rate=float(np.mean(round_trips > 0)) if round_trips.size else float('nan'),
+        exposure_pct=100.0 * float(held.mean()),
+        equity=equity,
+    )
+
+
+def format_result(result):
+    return "\n".join([
+        f"Final equity:   {result.final_equity:,.2f} EUR",
+        f"P/L:            {result.pl_eur:+,.2f} EUR ({result.pl_pct:+.2f}%)",
+        f"Buy and hold:   {result.buy_and_hold_pct:+.2f}%",
+        f"Max drawdown:   {result.max_drawdown_pct:.2f}%",
+        f"Realized P/L:   {result.realized_pl:+,.2f} EUR",
+        f"Fees paid:      {result.fees_eur:,.2f} EUR",
+        f"Trades:         {result.buys} buys / {result.sells} sells, win rate "
+        + ("n/a" if np.isnan(result.win_rate) else f"{result.win_rate:.0%}"),
+        f"Time in market: {result.exposure_pct:.1f}%",
+    ])
+
+
+def load_closes(symbol, interval, days, backfiller=None):
+    """Close prices of the last ``days`` of candles, backfilling the cache as needed."""
+    backfiller = backfiller or Backfiller()
+    end_ms = int(time.time() * 1000)
+    rows = backfiller.candles(symbol, interval, end_ms - int(days * 86_400_000), end_ms)
+    return np.array([r[4] for r in rows], dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the trading signal on historical candles.")
+    parser.add_argument('--symbol', default=PRIMARY_SYMBOL)
+    parser.add_argument('--interval', default='1m', choices=sorted(INTERVAL_MS, key=INTERVAL_MS.get))
+    parser.add_argument('--days', type=float, default=30.0)
+    parser.add_argument('--fee', type=float, default=DEFAULT_FEE)
+    parser.add_argument('--initial', type=float, default=DEFAULT_INITIAL_EUR)
+    parser.add_argument('--strong-only', action='store_true', help="trade only the strong signals")
+    args = parser.parse_args()
+
+    prices = load_closes(args.symbol, args.interval, args.days)
+    started = time.perf_counter()
+    result = run_backtest(prices, fee=args.fee, initial_eur=args.initial,
+                          min_strength=2 if args.strong_only else 1)
+    elapsed = time.perf_counter() - started
+    print(f"{args.symbol} {args.interval}, {prices.size:,} candles, backtested in {elapsed:.3f}s")
+    print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
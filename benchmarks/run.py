@@ -0,0 +1,358 @@
+"""Benchmarks for the tick pipeline: ingestion, indicators, rendering and SQLite.
+
+Every benchmark runs on deterministic synthetic prices (synthetic.py). Each
+result is appended to a JSON-lines history, and the best time is compared
+with the median of the previous runs of the same benchmark on this host.
+Slowdowns beyond the threshold are flagged as regressions.
+
+    python -m benchmarks.run                  # everything, saved to the history
+    python -m benchmarks.run -k render        # names containing 'render'
+    python -m benchmarks.run --no-save --fail # CI-style: exit 1 on a regression
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import indicators
+import portfolio
+from candles import CandleAggregator
+from chart_image import ChartRenderer, ChartTheme
+from db import ConnectionPool
+from decimate import DecimationCache
+from live_chart import LiveChart
+from markets import Watchlist
+from migrations import (PURCHASES_MIGRATIONS, SQL_HISTORY_PAGE_ORDER, SQL_INSERT_PURCHASE, SQL_PURCHASES_PAGE,
+                        SQL_TRANSACTION_HISTORY, STREAMLIT_MIGRATIONS, migrate)
+from ring_buffer import RingBuffer
+from tick_store import TickStore
+
+from benchmarks.synthetic import START_TIME, gbm_with_jumps, ticks
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl')
+REPEAT = 5
+# Runs of the same benchmark the baseline is taken from
+BASELINE_RUNS = 5
+REGRESSION_THRESHOLD = 0.2
+THEME = ChartTheme('#0E1117', '#FAFAFA', '#26A69A', '#EF5350')
+WINDOWS = (300, 3_000, 30_000)
+
+# Schema the Streamlit app creates before its migrations (BitcoinTrackerApp.initialize_db)
+STREAMLIT_BASE_SCHEMA = (
+    "CREATE TABLE transactions (transaction_id TEXT PRIMARY KEY, timestamp TEXT, type TEXT, "
+    "price REAL, eur_amount REAL, btc_amount REAL)",
+    "CREATE TABLE deposits (deposit_id TEXT PRIMARY KEY, timestamp TEXT, eur_deposited REAL)",
+    "CREATE TABLE app_state (key TEXT PRIMARY KEY, value REAL)",
+)
+
+BENCHMARKS = []
+_tempdir = tempfile.TemporaryDirectory(prefix='btc-bench-')
+
+
+def benchmark(name, params=(None,)):
+    """Registers ``setup(param) -> (run, items)``; only ``run()`` is timed, ``items`` is the work it does."""
+    def register(setup):
+        BENCHMARKS.append((name, params, setup))
+        return setup
+    return register
+
+
+def _db_path(name):
+    path = os.path.join(_tempdir.name, name)
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+def _filled_series(n):
+    """Tick RingBuffer of capacity ``n``, full, with indicators; plus ticks to append next."""
+    prices = gbm_with_jumps(2 * n, seed=1)
+    times = [START_TIME + timedelta(seconds=i) for i in range(2 * n)]
+    rsi = indicators.rsi(prices)
+    sma20, sma50 = indicators.sma(prices, 20), indicators.sma(prices, 50)
+    series = RingBuffer(n)
+    rows = [(times[i], dict(price=prices[i], rsi=rsi[i], sma20=sma20[i], sma50=sma50[i]))
+            for i in range(2 * n)]
+    for timestamp, values in rows[:n]:
+        series.append(timestamp, **values)
+    return series, iter(rows[n:])
+
+
+# --- Ingestion ---
+@benchmark('ingest.ring_buffer', params=(300, 10_000))
+def bench_ring_buffer(capacity):
+    data = ticks(10_000)
+
+    def run():
+        series = RingBuffer(capacity)
+        for timestamp, price in data:
+            series.append(timestamp, price=price, rsi=50.0, sma20=price, sma50=price)
+    return run, len(data)
+
+
+@benchmark('ingest.candles')
+def bench_candles(_):
+    data = ticks(10_000)
+
+    def run():
+        candles = CandleAggregator()
+        for timestamp, price in data:
+            candles.add(timestamp, price)
+    return run, len(data)
+
+
+@benchmark('ingest.watchlist', params=(1, 20))
+def bench_watchlist(symbols):
+    names = [f"SYM{i}EUR" for i in range(symbols)]
+    prices = np.stack([gbm_with_jumps(1_000, seed=i) for i in range(symbols)], axis=1)
+    times = [START_TIME + timedelta(seconds=i) for i in range(len(prices))]
+
+    def run():
+        watchlist = Watchlist(names, 300)
+        for timestamp, row in zip(times, prices):
+            watchlist.update(dict(zip(names, row)), timestamp)
+    return run, len(prices)
+
+
+# --- Indicators ---
+@benchmark('indicators.streaming')
+def bench_streaming_indicators(_):
+    prices = gbm_with_jumps(10_000).tolist()
+
+    def run():
+        engine = indicators.IndicatorEngine()
+        for price in prices:
+            engine.update(price)
+    return run, len(prices)
+
+
+@benchmark('indicators.vectorized', params=(10_000, 1_000_000))
+def bench_vectorized_indicators(n):
+    prices = gbm_with_jumps(n)
+
+    def run():
+        indicators.rsi(prices)
+        indicators.sma(prices, 20)
+        indicators.sma(prices, 50)
+    return run, n
+
+
+# --- Rendering ---
+@benchmark('render.decimate', params=WINDOWS + (300_000,))
+def bench_decimate(n):
+    series, _ = _filled_series(n)
+
+    def run():
+        DecimationCache().chart(series, 800, mdates.date2num)
+    return run, 1
+
+
+@benchmark('render.live_chart', params=WINDOWS)
+def bench_live_chart(n):
+    """One tick then one LiveChart.update, as the Tk app does per refresh."""
+    series, upcoming = _filled_series(n)
+    figure = Figure(figsize=(12, 8))
+    canvas = FigureCanvasAgg(figure)
+    price_ax, rsi_ax = figure.subplots(2, 1, gridspec_kw={'height_ratios': [2, 1]})
+    chart = LiveChart(figure, canvas, price_ax, rsi_ax, '#1e1e1e', '#ffffff')
+    chart.update(series)
+    updates = 20
+
+    def run():
+        for _ in range(updates):
+            timestamp, values = next(upcoming)
+            series.append(timestamp, **values)
+            chart.update(series)
+    return run, updates
+
+
+@benchmark('render.chart_png', params=WINDOWS)
+def bench_chart_png(n):
+    """One tick then a cache-missing ChartRenderer.render, as a Streamlit rerun does."""
+    series, upcoming = _filled_series(n)
+    renderer = ChartRenderer()
+    renderer.render('Ticks', series, (4, 2), 200, THEME)
+
+    def run():
+        timestamp, values = next(upcoming)
+        series.append(timestamp, **values)
+        renderer.render('Ticks', series, (4, 2), 200, THEME)
+    return run, 1
+
+
+# --- Persistence ---
+@benchmark('persist.ticks.append')
+def bench_tick_append(_):
+    data = ticks(10_000)
+    store = TickStore(_db_path('ticks.db'))
+
+    def run():
+        for timestamp, price in data:
+            store.append(timestamp, price)
+        store.flush()
+    return run, len(data)
+
+
+@benchmark('persist.ticks.recent')
+def bench_tick_recent(_):
+    store = TickStore(_db_path('ticks_recent.db'), batch_size=10_000)
+    for timestamp, price in ticks(100_000):
+        store.append(timestamp, price)
+    store.flush()
+
+    def run():
+        store.recent(300, max_age=None)
+    return run, 1
+
+
+@benchmark('persist.transactions', params=('write', 'read'))
+def bench_transactions(mode):
+    pool = ConnectionPool(_db_path(f'transactions_{mode}.db'), size=1)
+    with pool.transaction() as conn:
+        for statement in STREAMLIT_BASE_SCHEMA:
+            conn.execute(statement)
+    with pool.connection() as conn:
+        migrate(conn, STREAMLIT_MIGRATIONS)
+    with pool.transaction() as conn:
+        portfolio.ensure_aggregates(conn)
+        portfolio.record_deposit(conn, START_TIME, 1e9)
+    prices = gbm_with_jumps(500)
+    start = datetime.now()
+
+    def write():
+        # One committed transaction per trade, like the wallet forms
+        for i, price in enumerate(prices):
+            with pool.transaction() as conn:
+                portfolio.record_trade(conn, 'buy', start + timedelta(seconds=i), price, -100.0, 100.0 / price)
+    if mode == 'write':
+        return write, len(prices)
+
+    write()
+
+    def read():
+        with pool.connection() as conn:
+            conn.execute(SQL_TRANSACTION_HISTORY + SQL_HISTORY_PAGE_ORDER, (51,)).fetchall()
+            portfolio.load_aggregates(conn)
+    return read, 1
+
+
+@benchmark('persist.purchases', params=('write', 'read'))
+def bench_purchases(mode):
+    pool = ConnectionPool(_db_path(f'purchases_{mode}.db'), size=1)
+    with pool.connection() as conn:
+        migrate(conn, PURCHASES_MIGRATIONS)
+    prices = gbm_with_jumps(500)
+
+    def write():
+        for i, price in enumerate(prices):
+            timestamp = START_TIME + timedelta(seconds=i)
+            with pool.transaction() as conn:
+                conn.execute(SQL_INSERT_PURCHASE, (timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                                                   int(timestamp.timestamp()), price, 100.0, 100.0 / price, None))
+    if mode == 'write':
+        return write, len(prices)
+
+    write()
+
+    def read():
+        with pool.connection() as conn:
+            conn.execute(SQL_PURCHASES_PAGE, (2**62, 201)).fetchall()
+    return read, 1
+
+
+# --- Runner ---
+def time_run(run, repeat):
+    run()  # warm-up: imports, caches, first draw
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline(history, name, param, host, runs=BASELINE_RUNS):
+    """Median best time of the last ``runs`` results for this benchmark on this host."""
+    previous = [r['best_s'] for r in history
+                if r['name'] == name and r['param'] == param and r['host'] == host]
+    return statistics.median(previous[-runs:]) if previous else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-k', dest='pattern', help="only run benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="flag results this much slower than the baseline (0.2 = 20%%)")
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--no-save', action='store_true', help="compare only, do not append to the history")
+    parser.add_argument('--fail', action='store_true', help="exit with status 1 if anything regressed")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    host = platform.node()
+    stamp = dict(time=datetime.now().isoformat(timespec='seconds'), commit=git_commit(), host=host,
+                 python=platform.python_version())
+    results, regressions = [], []
+
+    print(f"{'benchmark':<32} {'best':>10} {'median':>10} {'per item':>10}  vs baseline")
+    for name, params, setup in BENCHMARKS:
+        if args.pattern and args.pattern not in name:
+            continue
+        for param in params:
+            run, items = setup(param)
+            best, median = time_run(run, args.repeat)
+            label = name if param is None else f"{name}[{param}]"
+            base = baseline(history, name, param, host)
+            if base is None:
+                change = "new"
+            else:
+                ratio = best / base
+                change = f"{ratio - 1:+.0%}"
+                if ratio > 1 + args.threshold:
+                    change += "  REGRESSION"
+                    regressions.append(label)
+            print(f"{label:<32} {best * 1e3:>8.2f}ms {median * 1e3:>8.2f}ms "
+                  f"{best / items * 1e6:>8.2f}us  {change}")
+            results.append(dict(stamp, name=name, param=param, items=items, best_s=best, median_s=median))
+
+    if not args.no_save:
+        with open(args.history, 'a') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        if args.fail:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
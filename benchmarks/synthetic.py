@@ -0,0 +1,38 @@
+"""Deterministic synthetic BTC/EUR prices for benchmarks.
+
+Geometric Brownian motion with Poisson jumps (Merton): a diffusion with
+crypto-like volatility plus occasional large moves, which is what stresses
+min/max decimation, candle highs/lows and the RSI. A seed fully determines
+the series, so every benchmark run sees the same data.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+START_PRICE = 60_000.0
+START_TIME = datetime(2024, 1, 1)
+
+
+def gbm_with_jumps(n, seed=0, start=START_PRICE, dt=1.0, mu=0.0, sigma=0.6,
+                   jump_rate=2.0, jump_mean=0.0, jump_std=0.03):
+    """``n`` prices, ``dt`` seconds apart.
+
+    ``mu`` and ``sigma`` are annualized drift and volatility, ``jump_rate``
+    the expected jumps per day and each jump's log-size is normal with
+    ``jump_mean``/``jump_std``.
+    """
+    rng = np.random.default_rng(seed)
+    step = dt / SECONDS_PER_YEAR
+    diffusion = (mu - 0.5 * sigma ** 2) * step + sigma * np.sqrt(step) * rng.standard_normal(n - 1)
+    jumps = rng.poisson(jump_rate * dt / 86400, n - 1)
+    jump_sizes = rng.normal(jump_mean * jumps, jump_std * np.sqrt(jumps))
+    log_returns = diffusion + jump_sizes
+    return start * np.exp(np.concatenate(([0.0], np.cumsum(log_returns))))
+
+
+def ticks(n, seed=0, start_time=START_TIME, dt=1.0, **kwargs):
+    """``n`` (datetime, price) ticks from ``gbm_with_jumps``."""
+    prices = gbm_with_jumps(n, seed=seed, dt=dt, **kwargs)
+    step = timedelta(seconds=dt)
+    return [(start_time + i * step, float(p)) for i, p in enumerate(prices)]
@@ -0,0 +1,107 @@
+"""Streaming OHLCV candle aggregation.
+
+Every tick updates one candle per timeframe in O(1): the candle still forming
+is the newest row of that timeframe's RingBuffer and is overwritten in place
+until a tick lands in the next bucket. Closing a candle feeds its close to
+that timeframe's IndicatorEngine, so RSI/SMA are available on every
+timeframe, not just on raw ticks. An hour of ticks is 3600 points but only
+60 one-minute candles, so long-range charts draw far fewer points.
+
+Ticker prices carry no traded volume, so ``volume`` stays 0 unless the caller
+passes one; ``ticks`` counts the prices that went into each candle.
+"""
+import time
+from datetime import datetime
+
+import metrics
+from indicators import IndicatorEngine
+from ring_buffer import RingBuffer
+
+TIMEFRAMES = {'1s': 1, '1m': 60, '5m': 300, '1h': 3600}
+# Timeframes worth seeding from cached klines at startup; 1s fills from ticks quickly
+SEEDED_TIMEFRAMES = ('1m', '5m', '1h')
+CANDLE_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'ticks', 'rsi', 'sma20', 'sma50')
+CANDLE_CAPACITY = 300
+
+
+def is_candles(series):
+    return 'open' in series.columns
+
+
+class CandleSeries:
+    """Candles of one timeframe with their own indicator state."""
+
+    def __init__(self, seconds, capacity=CANDLE_CAPACITY):
+        self.seconds = seconds
+        self.buffer = RingBuffer(capacity, CANDLE_COLUMNS)
+        self.indicators = IndicatorEngine()
+        self._bucket = None
+        self._seeded_through = None    # last bucket loaded from klines
+
+    def add(self, timestamp, price, volume=0.0):
+        bucket = int(timestamp.timestamp()) // self.seconds
+        if self._seeded_through is not None and bucket <= self._seeded_through:
+            return  # already counted in a seeded kline, e.g. a replayed tick
+        if bucket == self._bucket:
+            buffer = self.buffer
+            buffer.set_last(high=max(buffer.last('high'), price),
+                            low=min(buffer.last('low'), price),
+                            close=price,
+                            volume=buffer.last('volume') + volume,
+                            ticks=buffer.last('ticks') + 1)
+            return
+        if self._bucket is not None and bucket < self._bucket:
+            metrics.TICKS_LATE.inc()
+            return  # late tick for a candle that is already closed
+        if self._bucket is not None:
+            self._close()
+        self._bucket = bucket
+        self.buffer.append(datetime.fromtimestamp(bucket * self.seconds),
+                           open=price, high=price, low=price, close=price,
+                           volume=volume, ticks=1)
+
+    def seed(self, rows):
+        """Loads closed candles from (open_time_ms, open, high, low, close, volume) kline rows.
+
+        Later ticks that fall inside the seeded range are ignored.
+        """
+        for open_time, open_, high, low, close, volume in rows:
+            bucket = open_time // 1000 // self.seconds
+            if self._bucket is not None and bucket <= self._bucket:
+                continue
+            if self._bucket is not None:
+                self._close()
+            self._bucket = bucket
+            self.buffer.append(datetime.fromtimestamp(bucket * self.seconds),
+                               open=open_, high=high, low=low, close=close,
+                               volume=volume, ticks=0)
+            self._seeded_through = bucket
+
+    def _close(self):
+        rsi, sma20, sma50 = self.indicators.update(self.buffer.last('close'))
+        self.buffer.set_last(rsi=rsi, sma20=sma20, sma50=sma50)
+
+
+class CandleAggregator:
+    def __init__(self, timeframes=TIMEFRAMES, capacity=CANDLE_CAPACITY):
+        self.timeframes = {name: CandleSeries(seconds, capacity) for name, seconds in timeframes.items()}
+
+    def add(self, timestamp, price, volume=0.0):
+        for candles in self.timeframes.values():
+            candles.add(timestamp, price, volume)
+
+    def seed_history(self, backfiller, symbol, timeframes=SEEDED_TIMEFRAMES):
+        """Fills timeframes with historical klines, before any tick is added.
+
+        Backfill errors are raised, leaving later timeframes unseeded; callers
+        carry on without history.
+        """
+        end_ms = int(time.time() * 1000)
+        for timeframe in timeframes:
+            candles = self.timeframes[timeframe]
+            start_ms = end_ms - candles.buffer.capacity * candles.seconds * 1000
+            candles.seed(backfiller.candles(symbol, timeframe, start_ms, end_ms))
+
+    def __getitem__(self, timeframe):
+        """RingBuffer of the timeframe's candles, oldest first; the newest may still be forming."""
+        return self.timeframes[timeframe].buffer
@@ -0,0 +1,77 @@
+"""Browser-side streaming chart for the Streamlit dashboard.
+
+Instead of a server-rendered PNG per rerun, the chart lives in a custom
+component (chart_frontend/index.html) that keeps the rows it has already
+received and draws them on a canvas. Each rerun only passes the rows
+appended since the last one the session sent, identified by the buffer's
+``appended`` count, so the server never rasterizes and a quiet rerun sends
+nothing at all (Streamlit skips re-rendering a component whose arguments are
+unchanged).
+
+Delta protocol (component arguments):
+    view     buffer the rows belong to ('Ticks', '1m', ...)
+    reset    True when the client must drop what it holds
+    start    index of the first row in ``t``; the client replaces its rows
+             from ``start`` on, so resending the newest row (whose values may
+             have changed in place, e.g. a forming candle) is harmless
+    t        row times in ms, columns: {name: values} with NaN sent as null
+The component reports ``{'token', 'view', 'seq'}`` (a fresh token per report)
+when it mounts, so the server knows how many rows it holds, or when it finds
+a gap, with ``seq`` None, so that it is sent a full reset.
+"""
+import math
+import os
+
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+
+from candles import is_candles
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chart_frontend')
+CHART_HEIGHT = 420
+STATE_KEY = '_live_chart'
+
+_component = components.declare_component('live_chart', path=FRONTEND_DIR)
+
+
+def _json_values(values):
+    """Float list with NaN as None, since NaN is not valid JSON."""
+    return [None if math.isnan(v) else v for v in values.tolist()]
+
+
+def delta(series, sent):
+    """Rows of ``series`` a client holding ``sent`` rows is missing, as (reset, start, t, columns)."""
+    first = series.appended - len(series)
+    if sent is None or sent > series.appended or sent <= first:
+        reset, start = True, first
+    else:
+        # Also resend the newest row the client has: it may have changed in place
+        reset, start = False, sent - 1
+    i = start - first
+    t = series.times()[i:].astype('datetime64[ms]').astype(np.int64).tolist()
+    columns = {name: _json_values(series[name][i:]) for name in series.columns}
+    return reset, start, t, columns
+
+
+def live_chart(view, series, theme, height=CHART_HEIGHT, key='live_chart'):
+    """Draws ``series`` (a tick or candle RingBuffer) in the browser, sending only new rows."""
+    state = st.session_state.setdefault(STATE_KEY, {'view': None, 'sent': None, 'version': None,
+                                                   'args': None, 'report': None})
+    # The frontend's last report is already in session state before the component call
+    report = st.session_state.get(key)
+    if report and report.get('token') != state['report']:
+        state['report'] = report.get('token')
+        if report.get('view') != state['view'] or report.get('seq') is None:
+            state.update(sent=None, version=None)
+        else:
+            state['sent'] = report['seq']
+    if state['view'] != view:
+        state.update(view=view, sent=None, version=None)
+    if state['version'] != series.version:
+        reset, start, t, columns = delta(series, state['sent'])
+        state['args'] = dict(view=view, reset=reset, start=start, t=t, columns=columns,
+                             candles=is_candles(series), capacity=series.capacity)
+        state.update(sent=series.appended, version=series.version)
+
+    _component(**state['args'], theme=theme._asdict(), height=height, key=key, default=None)
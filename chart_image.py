@@ -0,0 +1,155 @@
+"""Price/RSI chart rendered to PNG for the Streamlit dashboard.
+
+Streamlit reruns the whole script for every interaction, so building,
+styling and rasterising a fresh figure each time dominated a rerun.
+``ChartRenderer`` keeps one styled figure alive and only swaps the data of
+its artists, and it caches the resulting PNG under (view, buffer version,
+size, theme): a rerun without a new price, or another session looking at
+the same snapshot, gets the cached bytes without touching matplotlib.
+
+The figure is created through matplotlib.figure.Figure rather than pyplot,
+so it is not tied to pyplot's global state and can be drawn from any of
+Streamlit's script threads (a lock serializes the drawing).
+"""
+import io
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+from candles import is_candles
+from decimate import DecimationCache
+
+ChartTheme = namedtuple('ChartTheme', 'bg text up down')
+
+# Rendered PNGs kept: one per view/size/theme combination still in use
+PNG_CACHE_SIZE = 16
+Y_MARGIN = 0.05
+CANDLE_BODY_WIDTH = 0.7     # fraction of the candle interval
+MIN_CANDLE_WIDTH_DAYS = 1 / 86400
+
+
+class ChartRenderer:
+    def __init__(self, cache_size=PNG_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._pngs = OrderedDict()
+        self._lock = threading.Lock()
+        self._decimation = DecimationCache()
+        self._figure = None
+        self._theme = None
+        self._layout = None  # (view, size, dpi, theme) the figure was last laid out for
+
+    def render(self, view, series, size, dpi, theme):
+        """PNG bytes of ``series`` (a tick or candle RingBuffer) drawn at ``size`` inches and ``dpi``.
+
+        ``view`` names the buffer (e.g. 'Ticks' or '1m'), since versions of
+        different buffers are not comparable.
+        """
+        key = (view, series.version, tuple(size), dpi, theme)
+        with self._lock:
+            png = self._pngs.get(key)
+            if png is None:
+                png = self._draw(view, series, tuple(size), dpi, theme)
+                self._pngs[key] = png
+                if len(self._pngs) > self.cache_size:
+                    self._pngs.popitem(last=False)
+            else:
+                self._pngs.move_to_end(key)
+            return png
+
+    def _draw(self, view, series, size, dpi, theme):
+        if self._figure is None or self._theme != theme:
+            self._build(theme)
+        fig = self._figure
+        fig.set_size_inches(size)
+        fig.set_dpi(dpi)
+
+        data = self._decimation.chart(series, self.price_ax.bbox.width, mdates.date2num)
+        x = data['x']
+        if is_candles(series):
+            price = self._set_candles(*data['candles'])
+            self.price_line.set_data([], [])
+        else:
+            self.price_line.set_data(*data['price'])
+            price = data['price'][1]
+            self.wicks.set_segments([])
+            self.bodies.set_verts([])
+        self.sma20_line.set_data(*data['sma20'])
+        self.sma50_line.set_data(*data['sma50'])
+        self.rsi_line.set_data(*data['rsi'])
+
+        self.price_ax.set_xlim(x[0], x[-1])
+        visible = np.concatenate((price, data['sma20'][1], data['sma50'][1]))
+        y_lo, y_hi = np.nanmin(visible), np.nanmax(visible)
+        margin = max((y_hi - y_lo) * Y_MARGIN, abs(y_hi) * 1e-4, 1e-9)
+        self.price_ax.set_ylim(y_lo - margin, y_hi + margin)
+
+        layout = (view, size, dpi, theme)
+        if layout != self._layout:
+            # Tick labels only change width with the view or size; skip the extra layout pass otherwise
+            fig.tight_layout(pad=0.3)
+            self._layout = layout
+
+        out = io.BytesIO()
+        fig.savefig(out, format='png', facecolor=theme.bg)
+        return out.getvalue()
+
+    def _set_candles(self, x, open_, high, low, close):
+        """Updates wicks and bodies; returns the lows and highs for scaling."""
+        width = (np.median(np.diff(x)) if x.size > 1 else MIN_CANDLE_WIDTH_DAYS) * CANDLE_BODY_WIDTH
+        colors = np.where(close >= open_, self._theme.up, self._theme.down)
+
+        self.wicks.set_segments(np.stack([np.column_stack((x, low)), np.column_stack((x, high))], axis=1))
+        self.wicks.set_color(colors)
+        # Keep doji candles visible as thin lines
+        close = np.where(close == open_, open_ + 1e-9, close)
+        left, right = x - width / 2, x + width / 2
+        self.bodies.set_verts(np.stack([
+            np.column_stack((left, open_)), np.column_stack((left, close)),
+            np.column_stack((right, close)), np.column_stack((right, open_)),
+        ], axis=1))
+        self.bodies.set_facecolor(colors)
+        self.bodies.set_edgecolor(colors)
+        return np.concatenate((low, high))
+
+    def _build(self, theme):
+        """Creates and styles the figure once per theme; later renders only change data."""
+        self._theme = theme
+        self._layout = None
+        fig = Figure(facecolor=theme.bg)
+        FigureCanvasAgg(fig)
+        price_ax, rsi_ax = fig.subplots(2, 1, sharex=True)
+
+        for ax in (price_ax, rsi_ax):
+            ax.set_facecolor(theme.bg)
+            ax.xaxis_date()
+            for spine in ax.spines.values():
+                spine.set_color(theme.text)
+            ax.grid(True, alpha=0.15, color=theme.text, linestyle=':')
+        price_ax.tick_params(colors=theme.text, which='both', labelsize=3)
+        rsi_ax.tick_params(colors=theme.text, which='both', labelrotation=10, labelsize=3)
+
+        price_ax.set_title('Bitcoin Price (EUR)', color=theme.text, fontsize=5)
+        price_ax.set_ylabel('Price', color=theme.text, fontsize=4)
+        self.price_line, = price_ax.plot([], [], label='BTC/EUR', color='#17BECF', linewidth=0.6)
+        self.sma20_line, = price_ax.plot([], [], label='SMA20', color='#FFA500', linewidth=0.4, linestyle='--')
+        self.sma50_line, = price_ax.plot([], [], label='SMA50', color='#FF00FF', linewidth=0.4, linestyle='--')
+        self.wicks = LineCollection([], linewidths=0.4)
+        self.bodies = PolyCollection([], linewidths=0.2)
+        price_ax.add_collection(self.wicks)
+        price_ax.add_collection(self.bodies)
+        price_ax.legend(loc='upper left', facecolor=theme.bg, labelcolor=theme.text, fontsize=3)
+
+        rsi_ax.set_title('RSI Indicator', color=theme.text, fontsize=5)
+        rsi_ax.set_ylabel('RSI', color=theme.text, fontsize=4)
+        rsi_ax.set_ylim(0, 100)
+        self.rsi_line, = rsi_ax.plot([], [], label='RSI', color='#9467BD', linewidth=0.6)
+        rsi_ax.axhline(y=70, color='#FF4444', linestyle='--', linewidth=0.4)
+        rsi_ax.axhline(y=30, color='#00FF00', linestyle='--', linewidth=0.4)
+        rsi_ax.legend(loc='upper left', facecolor=theme.bg, labelcolor=theme.text, fontsize=3)
+
+        self._figure, self.price_ax, self.rsi_ax = fig, price_ax, rsi_ax
@@ -0,0 +1,240 @@
+"""Process-wide price collector.
+
+One background thread (or one WebSocket stream) per process fetches prices
+for the whole watchlist and owns the buffers, indicator state and daily
+statistics. Viewers read immutable snapshots instead of polling the API and
+keeping their own copy of the series, so API calls and memory stay constant
+however many dashboards are open. With a tick store attached, every primary
+symbol tick is persisted and the last stored ticks are replayed on start, so
+the indicators are warm right away; a backfiller tops them up (and seeds the
+other symbols) with historical candles. The replay and backfill run on the
+collector thread before live collection begins, so ``start`` returns at once
+even when the API is slow or unreachable.
+
+Polling fetches every symbol with one batched request per tick. In stream
+mode the first (primary) symbol comes from the WebSocket trade stream and the
+rest of the watchlist is still polled in batches.
+"""
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+import metrics
+from backfill import seed_history
+from candles import CandleAggregator
+from markets import Watchlist
+from price_stream import PriceStream
+
+Snapshot = namedtuple('Snapshot', [
+    'series',          # RingBuffer copy of the primary symbol; treat as read-only
+    'candles',         # {timeframe: RingBuffer copy} of primary symbol candles
+    'current_price',   # primary symbol stats
+    'daily_high',
+    'daily_low',
+    'all_time_high',
+    'conversion',      # fx label of current_price, None for a native EUR price
+    'markets',         # DataFrame with one row per watchlist symbol
+    'fetch_ok',        # False if the most recent poll failed
+    'log_messages',    # recent errors, oldest first
+    'received_at',     # time.time() of the latest live primary tick, None before the first
+])
+
+
+class PriceCollector:
+    def __init__(self, fetch_prices, symbols, capacity, interval=1.0, all_time_highs=None,
+                 on_new_high=None, stream=False, stream_min_interval=0.25, tick_store=None,
+                 backfiller=None):
+        """``fetch_prices(symbols)`` returns {symbol: Quote}; ``on_new_high(symbol, price)``
+        is called from the collector thread."""
+        self.fetch_prices = fetch_prices
+        self.symbols = tuple(symbols)
+        self.primary = self.symbols[0]
+        self.capacity = capacity
+        self.interval = interval
+        self.on_new_high = on_new_high
+        self.stream = stream
+        self.stream_min_interval = stream_min_interval
+        self.tick_store = tick_store
+        self.backfiller = backfiller
+
+        self.watchlist = Watchlist(self.symbols, capacity, all_time_highs)
+        self.candles = CandleAggregator(capacity=capacity)
+        self.conversion = None
+        self.fetch_ok = True
+        self.log_messages = deque(maxlen=50)
+        self.received_at = None
+        self.shown_at = None    # received_at of the newest tick a view has reported as shown
+        self.missing = frozenset()    # polled symbols the last poll returned no price for
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._running = False
+        self._thread = None
+        self._price_stream = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="price-collector", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self._warm_up()
+        if not self._running:
+            return
+        polled = self.symbols
+        if self.stream:
+            self._price_stream = PriceStream(self.add_price, symbol=self.primary,
+                                             min_interval=self.stream_min_interval, on_gap=self._on_gap)
+            self._price_stream.start()
+            polled = self.symbols[1:]
+        if polled:
+            self._poll(polled)
+
+    def _warm_up(self):
+        backfiller = self.backfiller
+        if backfiller is not None:
+            # Seeded aside and swapped in, so snapshots never see half-seeded candles
+            candles = CandleAggregator(capacity=self.capacity)
+            try:
+                candles.seed_history(backfiller, self.primary)
+            except Exception as e:
+                backfiller = None
+                self._log_backfill_error(e)
+            with self._lock:
+                self.candles = candles
+        for symbol in self.symbols:
+            ticks = []
+            if symbol == self.primary and self.tick_store is not None:
+                ticks = self.tick_store.recent(self.capacity)
+            # Streamed ticks have no fixed cadence to sample history at
+            cadence = None if self.stream and symbol == self.primary else self.interval
+            if backfiller is not None and cadence is not None:
+                try:
+                    ticks = seed_history(ticks, self.capacity, backfiller, cadence, symbol=symbol)
+                except Exception as e:
+                    backfiller = None
+                    self._log_backfill_error(e)
+            self.warm_start(symbol, ticks)
+
+    def _log_backfill_error(self, error):
+        # Most likely the API is unreachable; the caller stops backfilling rather
+        # than waiting on it for every remaining symbol
+        with self._lock:
+            self.log_messages.append(f"{datetime.now():%H:%M:%S} - History backfill error: {error}")
+
+    def stop(self):
+        self._running = False
+        if self._price_stream is not None:
+            self._price_stream.stop()
+        if self.tick_store is not None:
+            self.tick_store.close()
+
+    def _poll(self, symbols):
+        while self._running:
+            started = time.monotonic()
+            try:
+                with metrics.STAGE_SECONDS.labels('fetch').time():
+                    quotes = self.fetch_prices(symbols)
+                self.add_quotes(quotes, datetime.now())
+                self._check_missing(symbols, quotes)
+            except Exception as e:
+                metrics.FETCH_ERRORS.inc()
+                with self._lock:
+                    self.fetch_ok = False
+                    self._snapshot = None
+                    self.log_messages.append(f"{datetime.now():%H:%M:%S} - Price fetch error: {e}")
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _check_missing(self, symbols, quotes):
+        # Logged when the set changes rather than on every poll
+        missing = frozenset(symbols).difference(quotes)
+        if missing == self.missing:
+            return
+        with self._lock:
+            if missing - self.missing:
+                self.log_messages.append(f"{datetime.now():%H:%M:%S} - No price for "
+                                         f"{', '.join(sorted(missing - self.missing))}")
+            self.missing = missing
+            self._snapshot = None
+
+    def _on_gap(self, missed):
+        message = "stream reconnected" if missed is None else f"stream gap of {missed} trades"
+        if missed is not None:
+            metrics.TICKS_DROPPED.inc(missed)
+        with self._lock:
+            self.log_messages.append(f"{datetime.now():%H:%M:%S} - Price {message}")
+            self._snapshot = None
+
+    def warm_start(self, symbol, ticks):
+        """Replays stored (timestamp, price) ticks of one symbol without persisting them again."""
+        with self._lock:
+            for timestamp, price in ticks:
+                self.watchlist.update({symbol: price}, timestamp)
+                if symbol == self.primary:
+                    self.candles.add(timestamp, price)
+            self._snapshot = None
+
+    def add_price(self, price, timestamp):
+        """Single primary-symbol tick, as delivered by the price stream."""
+        self.add_prices({self.primary: price}, timestamp)
+
+    def add_quotes(self, quotes, timestamp):
+        primary = quotes.get(self.primary)
+        self.add_prices({symbol: quote.price for symbol, quote in quotes.items()}, timestamp,
+                        conversion=primary.conversion if primary else None)
+
+    def add_prices(self, prices, timestamp, conversion=None):
+        """``conversion`` is the fx label of the primary symbol's price, if converted."""
+        with self._lock:
+            with metrics.STAGE_SECONDS.labels('indicators').time():
+                new_highs = self.watchlist.update(prices, timestamp)
+            if self.primary in prices:
+                self.received_at = time.time()
+                metrics.TICKS.inc()
+                with metrics.STAGE_SECONDS.labels('candles').time():
+                    self.candles.add(timestamp, prices[self.primary])
+                self.conversion = conversion
+            self.fetch_ok = True
+            self._snapshot = None
+        if self.tick_store is not None and self.primary in prices:
+            with metrics.STAGE_SECONDS.labels('persist').time():
+                self.tick_store.append(timestamp, prices[self.primary], conversion)
+
+        if self.on_new_high is not None:
+            for symbol in new_highs:
+                try:
+                    self.on_new_high(symbol, prices[symbol])
+                except Exception as e:
+                    with self._lock:
+                        self.log_messages.append(f"{datetime.now():%H:%M:%S} - Error saving all-time high: {e}")
+                        self._snapshot = None
+
+    def mark_shown(self, received_at):
+        """True only for the first view to show the tick received at ``received_at``."""
+        with self._lock:
+            if received_at is None or received_at == self.shown_at:
+                return False
+            self.shown_at = received_at
+            return True
+
+    def snapshot(self):
+        """Returns the current state; the same object is shared until the next change."""
+        with self._lock:
+            if self._snapshot is None:
+                price, daily_high, daily_low, all_time_high = self.watchlist.stats(self.primary)
+                self._snapshot = Snapshot(
+                    series=self.watchlist.series[self.primary].copy(),
+                    candles={name: candles.buffer.copy()
+                             for name, candles in self.candles.timeframes.items()},
+                    current_price=price,
+                    daily_high=daily_high,
+                    daily_low=daily_low,
+                    all_time_high=all_time_high,
+                    conversion=self.conversion,
+                    markets=self.watchlist.table(),
+                    fetch_ok=self.fetch_ok,
+                    log_messages=tuple(self.log_messages),
+                    received_at=self.received_at,
+                )
+            return self._snapshot
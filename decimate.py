@@ -0,0 +1,91 @@
+"""Point reduction for plotting large buffers.
+
+A line never needs more than about two points per horizontal pixel: within
+one pixel column only the lowest and highest values are visible. ``minmax``
+splits a series into one bucket per pixel and keeps each bucket's min and
+max (in their original order), so spikes survive while the point count is
+bounded by the axes width rather than by the buffer size. ``ohlc`` does the
+same for candles by merging neighbours into wider candles.
+
+``DecimationCache`` keeps the reduced arrays per buffer and version, so
+redrawing unchanged data (or serving the same snapshot to several Streamlit
+sessions) does no work at all.
+"""
+import weakref
+
+import numpy as np
+
+# Candles narrower than this many pixels are merged with their neighbours
+MIN_CANDLE_PIXELS = 3
+
+
+def _bucket_view(values, buckets, fill):
+    """Reshapes to (buckets, size), padding the tail with ``fill``."""
+    size = -(-values.size // buckets)
+    padded = np.full(buckets * size, fill)
+    padded[:values.size] = values
+    return padded.reshape(buckets, size), size
+
+
+def minmax(x, y, buckets):
+    """Reduces (x, y) to at most 2 * ``buckets`` points, keeping each bucket's extremes."""
+    if y.size <= 2 * buckets:
+        return x, y
+    low, size = _bucket_view(np.where(np.isnan(y), np.inf, y), buckets, np.inf)
+    high, _ = _bucket_view(np.where(np.isnan(y), -np.inf, y), buckets, -np.inf)
+    offsets = np.arange(buckets) * size
+    lo_idx = offsets + low.argmin(axis=1)
+    hi_idx = offsets + high.argmax(axis=1)
+    idx = np.sort(np.concatenate((lo_idx, hi_idx)))
+    # Padding only exists past the end; a bucket of NaNs keeps a NaN (a gap)
+    idx = np.unique(np.minimum(idx, y.size - 1))
+    return x[idx], y[idx]
+
+
+def ohlc(x, open_, high, low, close, buckets):
+    """Merges candles into at most ``buckets`` wider ones (first open, max high, min low, last close)."""
+    n = close.size
+    if n <= buckets:
+        return x, open_, high, low, close
+    size = -(-n // buckets)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    return (x[starts], open_[starts], np.fmax.reduceat(high, starts),
+            np.fmin.reduceat(low, starts), close[ends])
+
+
+class DecimationCache:
+    """Decimated chart data per RingBuffer, recomputed only when its version
+    or the target width changes."""
+
+    def __init__(self):
+        self._cache = weakref.WeakKeyDictionary()
+
+    def chart(self, series, pixels, convert):
+        """Returns {'x', 'price' or 'candles', 'sma20', 'sma50', 'rsi'} for ``series``.
+
+        ``x`` is the full time axis mapped through ``convert`` (e.g.
+        mdates.date2num); every other entry is an (x, ...) tuple reduced to
+        ``pixels`` columns. All entries come from the same buffer version.
+        """
+        pixels = max(int(pixels), 1)
+        key = (series.version, pixels)
+        entry = self._cache.get(series)
+        if entry is None or entry[0] != key:
+            entry = (key, self._compute(series, pixels, convert))
+            self._cache[series] = entry
+        return entry[1]
+
+    @staticmethod
+    def _compute(series, pixels, convert):
+        x = convert(series.times())
+        data = {'x': x}
+        if 'open' in series.columns:
+            data['candles'] = ohlc(x, np.array(series['open']), np.array(series['high']),
+                                   np.array(series['low']), np.array(series['close']),
+                                   max(pixels // MIN_CANDLE_PIXELS, 1))
+        else:
+            data['price'] = minmax(x, np.array(series['price']), pixels)
+        for column in ('sma20', 'sma50', 'rsi'):
+            data[column] = minmax(x, np.array(series[column]), pixels)
+        return data
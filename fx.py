@@ -0,0 +1,62 @@
+"""USDT -> EUR conversion rate for the BTCUSDT fallback.
+
+The rate is derived from the EURUSDT ticker and refreshed on a background
+thread, so converting a fallback price is a lookup rather than an extra
+request on the tick path. Until the first refresh succeeds the static
+USDT_TO_EUR estimate is used. Every conversion comes with a label (e.g.
+``EURUSDT:0.921234`` or ``static:0.920000``) that is stored next to the
+converted price, so it is always known how a stored EUR price was obtained.
+"""
+import threading
+import time
+
+FX_SYMBOL = "EURUSDT"
+FX_REFRESH_SECONDS = 60
+# Past this age a live rate is still used, but labelled stale
+FX_TTL_SECONDS = 300
+
+
+class FxRate:
+    def __init__(self, fetch_price, static_rate, refresh_interval=FX_REFRESH_SECONDS,
+                 ttl=FX_TTL_SECONDS):
+        """``fetch_price()`` returns the current EURUSDT price (USDT per EUR)."""
+        self.fetch_price = fetch_price
+        self.static_rate = static_rate
+        self.refresh_interval = refresh_interval
+        self.ttl = ttl
+        self._latest = None    # (rate, monotonic fetch time), replaced as a whole
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="fx-rate", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        while self._running:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing EUR rate: {e}")
+            time.sleep(self.refresh_interval)
+
+    def refresh(self):
+        self.update(self.fetch_price())
+
+    def update(self, price):
+        """Records a freshly fetched EURUSDT price, for callers that fetch it themselves."""
+        self._latest = (1.0 / price, time.monotonic())
+
+    def current(self):
+        """Returns (usdt_to_eur_rate, label) without blocking."""
+        latest = self._latest
+        if latest is None:
+            return self.static_rate, f"static:{self.static_rate:.6f}"
+        rate, fetched_at = latest
+        if time.monotonic() - fetched_at > self.ttl:
+            return rate, f"stale {FX_SYMBOL}:{rate:.6f}"
+        return rate, f"{FX_SYMBOL}:{rate:.6f}"
@@ -0,0 +1,222 @@
+"""Streaming technical indicators.
+
+Each indicator keeps only the state it needs to turn the next price into the
+next value, so an update costs O(1) regardless of how much history has been
+seen. The arithmetic mirrors talib's SMA and RSI so that feeding a series one
+price at a time yields the same values as running talib over the whole array.
+``sma`` and ``rsi`` at the bottom compute the same indicators over a whole
+array at once.
+"""
+import math
+from collections import deque, namedtuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+IndicatorValues = namedtuple('IndicatorValues', ['rsi', 'sma20', 'sma50'])
+# Updates between exact re-sums of a StreamingSMA window
+SMA_RESUM_INTERVAL = 10_000
+
+
+class StreamingSMA:
+    """Simple moving average over a fixed window, kept as a running sum."""
+
+    def __init__(self, period):
+        self.period = period
+        self.value = math.nan
+        self._window = deque()
+        self._total = 0.0
+        self._updates = 0
+
+    def update(self, price):
+        # Same order of operations as talib: add the new price, output, then
+        # subtract the trailing one, so the running sum rounds identically.
+        self._window.append(price)
+        self._total += price
+        if len(self._window) < self.period:
+            return self.value
+        self.value = self._total / self.period
+        self._total -= self._window.popleft()
+        self._updates += 1
+        if self._updates % SMA_RESUM_INTERVAL == 0:
+            # Add/subtract rounding error accumulates; restart the sum from the window
+            self._total = math.fsum(self._window)
+        return self.value
+
+
+class StreamingRSI:
+    """Wilder-smoothed RSI, seeded like talib with a simple mean of the first period."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.value = math.nan
+        self._prev_price = None
+        self._changes = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def update(self, price):
+        if self._prev_price is None:
+            self._prev_price = price
+            return self.value
+
+        change = price - self._prev_price
+        self._prev_price = price
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self._changes += 1
+
+        if self._changes < self.period:
+            self._avg_gain += gain
+            self._avg_loss += loss
+            return self.value
+
+        if self._changes == self.period:
+            self._avg_gain = (self._avg_gain + gain) / self.period
+            self._avg_loss = (self._avg_loss + loss) / self.period
+        else:
+            self._avg_gain = (self._avg_gain * (self.period - 1) + gain) / self.period
+            self._avg_loss = (self._avg_loss * (self.period - 1) + loss) / self.period
+
+        total = self._avg_gain + self._avg_loss
+        # talib reports 0 rather than dividing by a (near) zero total
+        self.value = 100.0 * (self._avg_gain / total) if abs(total) >= 1e-14 else 0.0
+        return self.value
+
+
+class IndicatorEngine:
+    """RSI14, SMA20 and SMA50 updated together from a single price stream."""
+
+    def __init__(self, rsi_period=14, sma20_period=20, sma50_period=50):
+        self.rsi = StreamingRSI(rsi_period)
+        self.sma20 = StreamingSMA(sma20_period)
+        self.sma50 = StreamingSMA(sma50_period)
+
+    def update(self, price):
+        return IndicatorValues(
+            self.rsi.update(price),
+            self.sma20.update(price),
+            self.sma50.update(price),
+        )
+
+
+# --- Vectorized counterparts, for whole price arrays (backtests, sweeps) ---
+
+def sma(prices, period):
+    """SMA over a float array; the first period - 1 values are NaN."""
+    prices = np.asarray(prices, dtype=float)
+    out = np.full(prices.shape, np.nan)
+    if prices.size >= period:
+        out[period - 1:] = sliding_window_view(prices, period).mean(axis=1)
+    return out
+
+
+def rsi(prices, period=14):
+    """Wilder RSI over a float array, matching StreamingRSI; the first period values are NaN."""
+    prices = np.asarray(prices, dtype=float)
+    out = np.full(prices.shape, np.nan)
+    if prices.size <= period:
+        return out
+    change = np.diff(prices)
+    gains = np.where(change > 0, change, 0.0)
+    losses = np.where(change < 0, -change, 0.0)
+    # Seed with the simple mean of the first period changes, then Wilder-smooth
+    gains[period - 1] = gains[:period].mean()
+    losses[period - 1] = losses[:period].mean()
+    alpha = 1.0 / period
+    avg_gain = pd.Series(gains[period - 1:]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    avg_loss = pd.Series(losses[period - 1:]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    total = avg_gain + avg_loss
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[period:] = np.where(np.abs(total) >= 1e-14, 100.0 * avg_gain / total, 0.0)
+    return out
+
+
+# --- Many symbols at once: one column per symbol, updated in a single step ---
+
+class VectorSMA:
+    """StreamingSMA for ``n`` symbols; each keeps its own window position."""
+
+    def __init__(self, period, n):
+        self.period = period
+        self.value = np.full(n, np.nan)
+        self._window = np.zeros((period, n))
+        self._pos = np.zeros(n, dtype=np.intp)
+        self._count = np.zeros(n, dtype=np.intp)
+        self._total = np.zeros(n)
+
+    def update(self, prices, idx):
+        """Feeds ``prices`` to the symbols at indices ``idx``."""
+        pos = self._pos[idx]
+        full = self._count[idx] == self.period
+        self._total[idx] -= np.where(full, self._window[pos, idx], 0.0)
+        self._window[pos, idx] = prices
+        self._total[idx] += prices
+        self._pos[idx] = (pos + 1) % self.period
+        self._count[idx] = np.minimum(self._count[idx] + 1, self.period)
+        self.value[idx] = np.where(self._count[idx] == self.period,
+                                   self._total[idx] / self.period, np.nan)
+        return self.value
+
+
+class VectorRSI:
+    """StreamingRSI for ``n`` symbols."""
+
+    def __init__(self, period, n):
+        self.period = period
+        self.value = np.full(n, np.nan)
+        self._prev = np.full(n, np.nan)
+        self._changes = np.zeros(n, dtype=np.intp)
+        self._avg_gain = np.zeros(n)
+        self._avg_loss = np.zeros(n)
+
+    def update(self, prices, idx):
+        prev = self._prev[idx]
+        self._prev[idx] = prices
+        seen = ~np.isnan(prev)
+        idx, prices, prev = idx[seen], prices[seen], prev[seen]
+        if idx.size == 0:
+            return self.value
+
+        change = prices - prev
+        gain = np.where(change > 0, change, 0.0)
+        loss = np.where(change < 0, -change, 0.0)
+        changes = self._changes[idx] + 1
+        self._changes[idx] = changes
+        avg_gain, avg_loss = self._avg_gain[idx], self._avg_loss[idx]
+
+        p = self.period
+        warming = changes < p
+        seeding = changes == p
+        avg_gain = np.where(warming, avg_gain + gain,
+                            np.where(seeding, (avg_gain + gain) / p, (avg_gain * (p - 1) + gain) / p))
+        avg_loss = np.where(warming, avg_loss + loss,
+                            np.where(seeding, (avg_loss + loss) / p, (avg_loss * (p - 1) + loss) / p))
+        self._avg_gain[idx] = avg_gain
+        self._avg_loss[idx] = avg_loss
+
+        total = avg_gain + avg_loss
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rsi = np.where(np.abs(total) >= 1e-14, 100.0 * avg_gain / total, 0.0)
+        self.value[idx] = np.where(warming, self.value[idx], rsi)
+        return self.value
+
+
+class MultiIndicatorEngine:
+    """IndicatorEngine for ``n`` symbols, one vectorized step per tick."""
+
+    def __init__(self, n, rsi_period=14, sma20_period=20, sma50_period=50):
+        self.rsi = VectorRSI(rsi_period, n)
+        self.sma20 = VectorSMA(sma20_period, n)
+        self.sma50 = VectorSMA(sma50_period, n)
+
+    def update(self, prices, idx):
+        """Feeds ``prices[k]`` to symbol ``idx[k]``; returns the values of all symbols."""
+        prices = np.asarray(prices, dtype=float)
+        idx = np.asarray(idx, dtype=np.intp)
+        return IndicatorValues(
+            self.rsi.update(prices, idx),
+            self.sma20.update(prices, idx),
+            self.sma50.update(prices, idx),
+        )
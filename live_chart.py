@@ -0,0 +1,167 @@
+"""Blitted price/RSI chart for the Tk dashboard.
+
+Everything static (facecolors, titles, grid, legends, RSI threshold lines,
+tick styling) is set up once. Each refresh only pushes new data into the
+existing Line2D artists and redraws them over a cached background. A full
+canvas draw happens only when the data leaves the current axis limits or the
+window is resized.
+
+``update`` takes either the tick series or a candle buffer from candles.py;
+candles are drawn as wick segments plus body rectangles, two collections no
+matter how many candles are shown. Data is decimated to the axes' pixel
+width first (see decimate.py), so draw time does not grow with the buffer.
+"""
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection, PolyCollection
+
+from candles import is_candles
+from decimate import DecimationCache
+
+# Fraction of the visible span kept free past the newest point / around the
+# price range, so that limits (and the background) change only occasionally.
+X_HEADROOM = 0.1
+Y_MARGIN = 0.1
+MIN_X_HEADROOM_DAYS = 30 / 86400
+CANDLE_BODY_WIDTH = 0.7     # fraction of the candle interval
+UP_COLOR = '#26A69A'
+DOWN_COLOR = '#EF5350'
+
+
+class LiveChart:
+    def __init__(self, figure, canvas, price_ax, rsi_ax, bg_color, text_color):
+        self.figure = figure
+        self.canvas = canvas
+        self.price_ax = price_ax
+        self.rsi_ax = rsi_ax
+        self._background = None
+        self._source = None
+        self._decimation = DecimationCache()
+
+        figure.set_facecolor(bg_color)
+        for ax in (price_ax, rsi_ax):
+            ax.set_facecolor(bg_color)
+            ax.tick_params(colors=text_color)
+            ax.tick_params(axis='x', rotation=45)
+            ax.grid(True, alpha=0.3, color=text_color)
+            ax.xaxis_date()
+            for spine in ax.spines.values():
+                spine.set_color(text_color)
+
+        self.price_line, = price_ax.plot([], [], label='BTC/EUR', color='#17BECF', animated=True)
+        self.sma20_line, = price_ax.plot([], [], label='SMA20', color='#7F7F7F', animated=True)
+        self.sma50_line, = price_ax.plot([], [], label='SMA50', color='#FFB6C1', animated=True)
+        self.rsi_line, = rsi_ax.plot([], [], label='RSI', color='#9467BD', animated=True)
+        self.wicks = LineCollection([], linewidths=0.8, animated=True)
+        self.bodies = PolyCollection([], animated=True)
+        price_ax.add_collection(self.wicks)
+        price_ax.add_collection(self.bodies)
+        self.rsi_ax.axhline(y=70, color='#ff4444', linestyle='--')
+        self.rsi_ax.axhline(y=30, color='#00ff00', linestyle='--')
+        self._lines = (self.wicks, self.bodies, self.price_line, self.sma20_line,
+                       self.sma50_line, self.rsi_line)
+
+        price_ax.set_title('Bitcoin Price (EUR)', pad=10, color=text_color)
+        price_ax.set_ylabel('Price (EUR)', color=text_color)
+        price_ax.legend(loc='upper left', facecolor=bg_color, labelcolor=text_color)
+        rsi_ax.set_title('RSI Indicator', pad=10, color=text_color)
+        rsi_ax.set_ylabel('RSI', color=text_color)
+        rsi_ax.set_ylim(0, 100)
+        rsi_ax.legend(loc='upper left', facecolor=bg_color, labelcolor=text_color)
+
+        figure.tight_layout()
+        canvas.mpl_connect('draw_event', self._on_draw)
+        canvas.mpl_connect('resize_event', self._on_resize)
+
+    def update(self, series, key=None):
+        """Redraws the chart from a tick or candle RingBuffer, doing nothing if it has not changed.
+
+        ``key`` names the data source when ``series`` is a fresh copy each time
+        (e.g. the chart view); by default the buffer object itself is the source.
+        """
+        source = (id(series) if key is None else key, series.version)
+        if source == self._source or len(series) == 0:
+            return
+        switched = self._source is None or self._source[0] != source[0]
+        self._source = source
+
+        # Decimated copies: the artists keep their arrays, and buffer views get overwritten.
+        data = self._decimation.chart(series, self.price_ax.bbox.width, mdates.date2num)
+        x = data['x']
+        if is_candles(series):
+            price = self._set_candles(*data['candles'])
+            self.price_line.set_data([], [])
+        else:
+            self.price_line.set_data(*data['price'])
+            price = data['price'][1]
+            self.wicks.set_segments([])
+            self.bodies.set_verts([])
+        self.sma20_line.set_data(*data['sma20'])
+        self.sma50_line.set_data(*data['sma50'])
+        self.rsi_line.set_data(*data['rsi'])
+        sma20, sma50 = data['sma20'][1], data['sma50'][1]
+
+        if switched:
+            # Limits fitted to another series would leave this one off-screen
+            self.price_ax.set_xlim(x[0], x[0] + MIN_X_HEADROOM_DAYS)
+        if self._rescale(x, price, sma20, sma50) or self._background is None:
+            # The draw_event handler re-captures the background and blits.
+            self.canvas.draw()
+        else:
+            self._blit()
+
+    def _set_candles(self, x, open_, high, low, close):
+        """Updates wicks and bodies; returns the lows and highs for rescaling."""
+        width = (np.median(np.diff(x)) if x.size > 1 else MIN_X_HEADROOM_DAYS) * CANDLE_BODY_WIDTH
+        colors = np.where(close >= open_, UP_COLOR, DOWN_COLOR)
+
+        self.wicks.set_segments(np.stack([np.column_stack((x, low)), np.column_stack((x, high))], axis=1))
+        self.wicks.set_color(colors)
+        left, right = x - width / 2, x + width / 2
+        self.bodies.set_verts(np.stack([
+            np.column_stack((left, open_)), np.column_stack((left, close)),
+            np.column_stack((right, close)), np.column_stack((right, open_)),
+        ], axis=1))
+        self.bodies.set_facecolor(colors)
+        self.bodies.set_edgecolor(colors)
+        return np.concatenate((low, high))
+
+    def _rescale(self, x, price, sma20, sma50):
+        changed = False
+
+        x_lo, x_hi = self.price_ax.get_xlim()
+        if x[-1] > x_hi or x[0] > x_lo + (x_hi - x_lo) * X_HEADROOM:
+            span = max(x[-1] - x[0], MIN_X_HEADROOM_DAYS)
+            headroom = max(span * X_HEADROOM, MIN_X_HEADROOM_DAYS)
+            self.price_ax.set_xlim(x[0], x[-1] + headroom)
+            self.rsi_ax.set_xlim(x[0], x[-1] + headroom)
+            changed = True
+
+        visible = np.concatenate((price, sma20, sma50))
+        y_lo, y_hi = np.nanmin(visible), np.nanmax(visible)
+        margin = max((y_hi - y_lo) * Y_MARGIN, abs(y_hi) * 1e-4, 1e-9)
+        ax_lo, ax_hi = self.price_ax.get_ylim()
+        # Also tighten the axis once the data only fills a small part of it
+        shrunk = (y_hi - y_lo + 2 * margin) < (ax_hi - ax_lo) * (1 - 4 * Y_MARGIN)
+        if y_lo < ax_lo or y_hi > ax_hi or shrunk:
+            self.price_ax.set_ylim(y_lo - margin, y_hi + margin)
+            changed = True
+
+        return changed
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _on_resize(self, event):
+        self.figure.tight_layout()
+        self._background = None
+
+    def _blit(self):
+        self.canvas.restore_region(self._background)
+        self._draw_lines()
+        self.canvas.blit(self.figure.bbox)
+
+    def _draw_lines(self):
+        for line in self._lines:
+            self.figure.draw_artist(line)
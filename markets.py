@@ -0,0 +1,85 @@
+"""Market data for a watchlist of symbols.
+
+Prices, daily high/low, all-time highs, indicators and signal codes are kept
+as one NumPy array per field with a slot per symbol, so a tick of the whole
+watchlist is a handful of vectorized operations rather than a Python loop of
+per-symbol updates. Each symbol still gets its own RingBuffer for charting.
+"""
+import numpy as np
+import pandas as pd
+
+import signals
+from indicators import MultiIndicatorEngine
+from ring_buffer import RingBuffer
+
+TABLE_COLUMNS = ['Price', 'Daily High', 'Daily Low', 'ATH', 'RSI', 'SMA20', 'SMA50', 'Signal']
+
+
+def parse_symbols(text):
+    """'BTCEUR, ethEUR' -> ('BTCEUR', 'ETHEUR'), keeping order and dropping duplicates."""
+    return tuple(dict.fromkeys(s.strip().upper() for s in text.split(',') if s.strip()))
+
+
+class Watchlist:
+    def __init__(self, symbols, capacity, all_time_highs=None):
+        self.symbols = tuple(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.series = {symbol: RingBuffer(capacity) for symbol in self.symbols}
+        self.indicators = MultiIndicatorEngine(n)
+
+        self.price = np.full(n, np.nan)
+        self.daily_high = np.full(n, np.nan)
+        self.daily_low = np.full(n, np.nan)
+        self.all_time_high = np.array([(all_time_highs or {}).get(s, 0.0) for s in self.symbols])
+        self.codes = np.full(n, signals.HOLD, dtype=np.int8)
+        self._reset_day = np.full(n, -1)
+
+    def update(self, prices, timestamp):
+        """Applies one tick of {symbol: price}; unknown symbols are ignored.
+
+        Returns the symbols that set a new all-time high.
+        """
+        known = [(self.index[s], p) for s, p in prices.items() if s in self.index]
+        if not known:
+            return []
+        idx = np.fromiter((i for i, _ in known), dtype=np.intp, count=len(known))
+        new = np.fromiter((p for _, p in known), dtype=float, count=len(known))
+
+        day = timestamp.toordinal()
+        reset = self._reset_day[idx] != day
+        self._reset_day[idx] = day
+        self.daily_high[idx] = np.where(reset, new, np.fmax(self.daily_high[idx], new))
+        self.daily_low[idx] = np.where(reset, new, np.fmin(self.daily_low[idx], new))
+        new_high = new > self.all_time_high[idx]
+        self.all_time_high[idx] = np.maximum(self.all_time_high[idx], new)
+        self.price[idx] = new
+
+        rsi, sma20, sma50 = self.indicators.update(new, idx)
+        self.codes = signals.classify_array(rsi, self.price, sma20, sma50)
+        for i, price in zip(idx, new):
+            self.series[self.symbols[i]].append(timestamp, price=price,
+                                                rsi=rsi[i], sma20=sma20[i], sma50=sma50[i])
+        return [self.symbols[i] for i in idx[new_high]]
+
+    def stats(self, symbol):
+        """(price, daily_high, daily_low, all_time_high) for one symbol; 0.0 before its first tick."""
+        i = self.index[symbol]
+        return tuple(float(np.nan_to_num(field[i]))
+                     for field in (self.price, self.daily_high, self.daily_low, self.all_time_high))
+
+    def table(self):
+        """One row per symbol with its latest stats, indicators and signal."""
+        values = self.indicators
+        ready = ~np.isnan(values.sma50.value)
+        return pd.DataFrame({
+            'Price': self.price,
+            'Daily High': self.daily_high,
+            'Daily Low': self.daily_low,
+            'ATH': self.all_time_high,
+            'RSI': values.rsi.value,
+            'SMA20': values.sma20.value,
+            'SMA50': values.sma50.value,
+            'Signal': [signals.SIGNAL_NAMES[c] if r else "Collecting data..."
+                       for c, r in zip(self.codes, ready)],
+        }, index=pd.Index(self.symbols, name='Symbol'), columns=TABLE_COLUMNS)
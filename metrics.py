@@ -0,0 +1,228 @@
+"""In-process latency and throughput metrics.
+
+Histograms time the pipeline stages (fetch, indicators, candles, persist,
+render, ui), the SQLite queries and the tick-to-screen latency. Counters
+track ticks and those that were dropped, late or coalesced away. Everything
+is exported in the Prometheus text format by a small local HTTP endpoint and
+summarized for the debug panels of both apps.
+
+Collection is off unless BTC_METRICS=1. When it is off, ``time()`` returns a
+shared no-op context manager and ``inc``/``observe`` return immediately, so
+the instrumented code pays about one attribute check per call.
+
+    BTC_METRICS=1 python app.py
+    curl localhost:9464/metrics
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get('BTC_METRICS', '').lower() in ('1', 'true', 'yes')
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = int(os.environ.get('BTC_METRICS_PORT', 9464))
+# Upper bounds in seconds, from sub-millisecond indicator updates to slow HTTP fetches
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SUMMARY_COLUMNS = ('Metric', 'Label', 'Count', 'Mean ms', 'p50 ms', 'p95 ms', 'Max ms')
+
+_NOOP = nullcontext()
+_registry = []
+
+
+def enable(enabled=True):
+    global ENABLED
+    ENABLED = enabled
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, label=None, register=True):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.value = 0
+        self._children = {}
+        self._lock = threading.Lock()
+        if register:
+            _registry.append(self)
+
+    def labels(self, value):
+        """The counter for one value of ``label``."""
+        child = self._children.get(value)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(value, type(self)(self.name, self.help, register=False))
+        return child
+
+    def inc(self, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self.value += amount
+
+    def series(self):
+        """[(label value or None, metric)] for every series of this metric."""
+        if self.label is None:
+            return [(None, self)]
+        return sorted(self._children.items(), key=lambda item: str(item[0]))
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, name, help, label=None, buckets=LATENCY_BUCKETS, register=True):
+        super().__init__(name, help, label, register)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def labels(self, value):
+        child = self._children.get(value)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(
+                    value, Histogram(self.name, self.help, buckets=self.buckets, register=False))
+        return child
+
+    def observe(self, seconds):
+        if not ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+            if seconds > self.max:
+                self.max = seconds
+
+    def time(self):
+        """Context manager observing the duration of its block."""
+        return _Timer(self) if ENABLED else _NOOP
+
+    def quantile(self, q):
+        """Estimate of the ``q`` quantile, interpolated within its bucket."""
+        with self._lock:
+            counts, total, top = list(self.counts), self.count, self.max
+        if total == 0:
+            return float('nan')
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                # The largest observation bounds the top of its bucket more tightly
+                upper = min(self.buckets[i], top) if i < len(self.buckets) else top
+                lower = min(self.buckets[i - 1], upper) if i > 0 else 0.0
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return top
+
+
+# --- Pipeline metrics ---
+STAGE_SECONDS = Histogram('btc_stage_seconds', "Time spent in each pipeline stage", label='stage')
+DB_SECONDS = Histogram('btc_db_query_seconds', "SQLite query and write durations", label='query')
+TICK_TO_SCREEN_SECONDS = Histogram('btc_tick_to_screen_seconds', "Age of each primary tick when it is first shown")
+TICKS = Counter('btc_ticks_total', "Primary symbol ticks received")
+TICKS_DROPPED = Counter('btc_ticks_dropped_total', "Trades the price stream reported as missed")
+TICKS_LATE = Counter('btc_ticks_late_total', "Ticks older than the candle they would belong to")
+UI_COALESCED = Counter('btc_ui_snapshots_coalesced_total', "Tk snapshots replaced by a newer one before drawing")
+FETCH_ERRORS = Counter('btc_fetch_errors_total', "Failed price fetches")
+
+
+def _format_labels(metric, value, extra=None):
+    pairs = []
+    if metric.label is not None and value is not None:
+        pairs.append((metric.label, value))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+def render_prometheus():
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for value, series in metric.series():
+            if metric.kind == 'counter':
+                lines.append(f"{metric.name}{_format_labels(metric, value)} {series.value}")
+                continue
+            with series._lock:
+                counts, total, count = list(series.counts), series.sum, series.count
+            cumulative = 0
+            for bound, n in zip(series.buckets + ('+Inf',), counts):
+                cumulative += n
+                lines.append(f"{metric.name}_bucket{_format_labels(metric, value, ('le', bound))} {cumulative}")
+            lines.append(f"{metric.name}_sum{_format_labels(metric, value)} {total}")
+            lines.append(f"{metric.name}_count{_format_labels(metric, value)} {count}")
+    return '\n'.join(lines) + '\n'
+
+
+def summary():
+    """Rows of SUMMARY_COLUMNS (metric, label, count, mean/p50/p95/max in ms) for the debug panels.
+
+    Counters fill only ``count``; timings are None for histograms with no observations.
+    """
+    rows = []
+    for metric in _registry:
+        for value, series in metric.series():
+            if metric.kind == 'counter':
+                rows.append((metric.name, value, series.value, None, None, None, None))
+            elif series.count:
+                rows.append((metric.name, value, series.count, series.sum / series.count * 1e3,
+                             series.quantile(0.5) * 1e3, series.quantile(0.95) * 1e3, series.max * 1e3))
+            else:
+                rows.append((metric.name, value, 0, None, None, None, None))
+    return rows
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes would otherwise flood the console
+
+
+def serve(host=METRICS_HOST, port=METRICS_PORT):
+    """Starts the /metrics endpoint on a daemon thread; returns the server, or None if disabled or the port is taken."""
+    if not ENABLED:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        print(f"Error starting metrics endpoint on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,115 @@
+"""Versioned schema migrations for the SQLite databases.
+
+The schema version is kept in ``PRAGMA user_version``. Each migration is a
+list of statements applied in one transaction together with the version bump,
+so an existing .db file is brought up to date on open and a half-applied
+migration is never left behind.
+
+Timestamps were historically stored as local-time TEXT. Version 1 adds an
+integer ``ts_epoch`` column (UTC seconds) next to them, backfills it, and
+indexes it so history views can use keyset pagination over
+``(ts_epoch, rowid)`` instead of sorting whole tables. Version 2 adds a
+``conversion`` column recording how a stored EUR price was obtained: NULL
+for a native BTCEUR price, else the fx label applied to a BTCUSDT price.
+"""
+
+# Local-time TEXT timestamp -> UTC epoch seconds
+EPOCH_FROM_TEXT = "CAST(strftime('%s', timestamp, 'utc') AS INTEGER)"
+
+STREAMLIT_MIGRATIONS = [
+    # 1: epoch timestamps and indexes for transactions and deposits
+    [
+        "ALTER TABLE transactions ADD COLUMN ts_epoch INTEGER",
+        f"UPDATE transactions SET ts_epoch = {EPOCH_FROM_TEXT}",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_ts ON transactions (ts_epoch)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_ts ON transactions (type, ts_epoch)",
+        "ALTER TABLE deposits ADD COLUMN ts_epoch INTEGER",
+        f"UPDATE deposits SET ts_epoch = {EPOCH_FROM_TEXT}",
+        "CREATE INDEX IF NOT EXISTS idx_deposits_ts ON deposits (ts_epoch)",
+    ],
+    # 2: how each trade price was converted to EUR
+    [
+        "ALTER TABLE transactions ADD COLUMN conversion TEXT",
+    ],
+]
+
+PURCHASES_MIGRATIONS = [
+    # 1: canonical purchases table with epoch timestamps. Older files named
+    # the price column btc_price, so rows are copied positionally.
+    [
+        "CREATE TABLE IF NOT EXISTS purchases (timestamp TEXT, price REAL, eur_amount REAL, btc_amount REAL)",
+        "CREATE TABLE purchases_v1 (timestamp TEXT, price REAL, eur_amount REAL, btc_amount REAL, ts_epoch INTEGER)",
+        f"INSERT INTO purchases_v1 (rowid, timestamp, price, eur_amount, btc_amount, ts_epoch) "
+        f"SELECT rowid, *, {EPOCH_FROM_TEXT} FROM purchases",
+        "DROP TABLE purchases",
+        "ALTER TABLE purchases_v1 RENAME TO purchases",
+        "CREATE INDEX IF NOT EXISTS idx_purchases_ts ON purchases (ts_epoch)",
+    ],
+    # 2: how each purchase price was converted to EUR
+    [
+        "ALTER TABLE purchases ADD COLUMN conversion TEXT",
+    ],
+]
+
+TICKS_MIGRATIONS = [
+    # 1: append-only tick log, epoch milliseconds
+    [
+        "CREATE TABLE IF NOT EXISTS ticks (ts_ms INTEGER NOT NULL, price REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_ticks_ts ON ticks (ts_ms)",
+    ],
+    # 2: how each tick was converted to EUR
+    [
+        "ALTER TABLE ticks ADD COLUMN conversion TEXT",
+    ],
+]
+
+KLINES_MIGRATIONS = [
+    # 1: candle cache, one row per (symbol, interval, open_time)
+    [
+        "CREATE TABLE IF NOT EXISTS klines ("
+        "symbol TEXT NOT NULL, interval TEXT NOT NULL, open_time INTEGER NOT NULL, "
+        "open REAL, high REAL, low REAL, close REAL, volume REAL, "
+        "PRIMARY KEY (symbol, interval, open_time)) WITHOUT ROWID",
+    ],
+]
+
+
+# Statements on the migrated schema shared by the apps and benchmarks/run.py,
+# so the benchmarks time exactly what the apps execute.
+SQL_INSERT_PURCHASE = ("INSERT INTO purchases (timestamp, ts_epoch, price, eur_amount, btc_amount, conversion) "
+                       "VALUES (?, ?, ?, ?, ?, ?)")
+# Keyset pages of purchases, newest first, up to the newest rowid already loaded
+SQL_PURCHASES_PAGE = ("SELECT rowid, timestamp, price, eur_amount, btc_amount, ts_epoch FROM purchases "
+                      "WHERE rowid <= ? ORDER BY ts_epoch DESC, rowid DESC LIMIT ?")
+SQL_PURCHASES_OLDER_PAGE = ("SELECT rowid, timestamp, price, eur_amount, btc_amount, ts_epoch FROM purchases "
+                            "WHERE (ts_epoch, rowid) < (?, ?) AND rowid <= ? "
+                            "ORDER BY ts_epoch DESC, rowid DESC LIMIT ?")
+SQL_TRANSACTION_HISTORY = ("SELECT rowid, ts_epoch, timestamp, type, price, eur_amount, btc_amount, conversion "
+                           "FROM transactions")
+SQL_DEPOSIT_HISTORY = "SELECT rowid, ts_epoch, timestamp, eur_deposited FROM deposits"
+# Appended to a history SELECT and its WHERE clause to fetch one page, newest first
+SQL_HISTORY_PAGE_ORDER = " ORDER BY ts_epoch DESC, rowid DESC LIMIT ?"
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations):
+    """Applies every migration newer than the database's version; returns the new version."""
+    version = schema_version(conn)
+    for target in range(version + 1, len(migrations) + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if schema_version(conn) >= target:
+                conn.rollback()
+                continue
+            for statement in migrations[target - 1]:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return schema_version(conn)
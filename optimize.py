@@ -0,0 +1,150 @@
+"""Parameter sweep for the signal thresholds and indicator periods.
+
+Grid or random search over the RSI thresholds and the SMA/RSI periods, fanned
+out over a ProcessPoolExecutor. The price history is placed in one
+``multiprocessing.shared_memory`` block that every worker maps as a NumPy
+array, so the dataset is neither pickled per task nor copied per worker. Each
+worker caches the indicator arrays it has computed per period, so only the
+cheap signal/equity pass runs for most parameter sets.
+
+    python optimize.py --interval 1m --days 365 [--random 500] [--out sweep.csv]
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import signals
+from backfill import INTERVAL_MS
+from backtest import DEFAULT_FEE, load_closes, run_backtest
+from price_client import PRIMARY_SYMBOL
+
+PARAM_GRID = {
+    'strong_buy_rsi': [20, 25, 30],
+    'buy_rsi': [30, 35, 40],
+    'sell_rsi': [60, 65, 70],
+    'strong_sell_rsi': [70, 75, 80],
+    'sma_fast': [10, 20, 30],
+    'sma_slow': [50, 100, 200],
+    'rsi_period': [14],
+}
+RANK_BY = 'pl_pct'
+RESULT_COLUMNS = ['pl_pct', 'pl_eur', 'max_drawdown_pct', 'buy_and_hold_pct',
+                  'buys', 'sells', 'win_rate', 'fees_eur', 'exposure_pct']
+
+# Per-worker state, set up once by _init_worker
+_shm = None
+_prices = None
+_indicator_cache = {}
+
+
+def valid(params):
+    return (params['strong_buy_rsi'] <= params['buy_rsi'] < params['sell_rsi'] <= params['strong_sell_rsi']
+            and params['sma_fast'] < params['sma_slow'])
+
+
+def grid_search(grid=PARAM_GRID):
+    names = list(grid)
+    for combo in itertools.product(*grid.values()):
+        params = dict(zip(names, combo))
+        if valid(params):
+            yield params
+
+
+def random_search(count, grid=PARAM_GRID, seed=None):
+    """``count`` distinct valid parameter sets drawn from the grid's values."""
+    rng = random.Random(seed)
+    candidates = list(grid_search(grid))
+    return rng.sample(candidates, min(count, len(candidates)))
+
+
+def _init_worker(shm_name, size):
+    global _shm, _prices
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _prices = np.ndarray((size,), dtype=np.float64, buffer=_shm.buf)
+
+
+def _cached(kind, period):
+    key = (kind, period)
+    if key not in _indicator_cache:
+        _indicator_cache[key] = indicators.rsi(_prices, period) if kind == 'rsi' else indicators.sma(_prices, period)
+    return _indicator_cache[key]
+
+
+def _evaluate(params, fee, min_strength):
+    rules = signals.SignalRules(params['strong_buy_rsi'], params['strong_sell_rsi'],
+                                params['buy_rsi'], params['sell_rsi'])
+    values = indicators.IndicatorValues(_cached('rsi', params['rsi_period']),
+                                        _cached('sma', params['sma_fast']),
+                                        _cached('sma', params['sma_slow']))
+    result = run_backtest(_prices, rules, fee=fee, min_strength=min_strength, values=values)
+    return {**params, **{name: getattr(result, name) for name in RESULT_COLUMNS}}
+
+
+def _evaluate_batch(batch, fee, min_strength):
+    return [_evaluate(params, fee, min_strength) for params in batch]
+
+
+def sweep(prices, param_sets, fee=DEFAULT_FEE, min_strength=1, workers=None, batch_size=16):
+    """Backtests every parameter set in parallel; returns a DataFrame ranked by RANK_BY."""
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    param_sets = list(param_sets)
+    # Sorted so a batch spans few period combinations and its worker computes few new
+    # indicator arrays; the pool has no worker affinity, so batches are not routed by period
+    param_sets.sort(key=lambda p: (p['rsi_period'], p['sma_fast'], p['sma_slow']))
+    batches = [param_sets[i:i + batch_size] for i in range(0, len(param_sets), batch_size)]
+
+    shm = shared_memory.SharedMemory(create=True, size=prices.nbytes)
+    try:
+        np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_worker, initargs=(shm.name, prices.size)) as executor:
+            futures = [executor.submit(_evaluate_batch, batch, fee, min_strength) for batch in batches]
+            rows = [row for future in futures for row in future.result()]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = pd.DataFrame(rows)
+    if not results.empty:
+        results = results.sort_values(RANK_BY, ascending=False, ignore_index=True)
+        results.index += 1
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep signal parameters over historical candles.")
+    parser.add_argument('--symbol', default=PRIMARY_SYMBOL)
+    parser.add_argument('--interval', default='1m', choices=sorted(INTERVAL_MS, key=INTERVAL_MS.get))
+    parser.add_argument('--days', type=float, default=365.0)
+    parser.add_argument('--fee', type=float, default=DEFAULT_FEE)
+    parser.add_argument('--strong-only', action='store_true', help="trade only the strong signals")
+    parser.add_argument('--random', type=int, metavar='N', help="sample N parameter sets instead of the full grid")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--workers', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--out', default='sweep_results.csv')
+    args = parser.parse_args()
+
+    prices = load_closes(args.symbol, args.interval, args.days)
+    param_sets = random_search(args.random, seed=args.seed) if args.random else list(grid_search())
+    print(f"Sweeping {len(param_sets)} parameter sets over {prices.size:,} {args.interval} candles")
+
+    started = time.perf_counter()
+    results = sweep(prices, param_sets, fee=args.fee,
+                    min_strength=2 if args.strong_only else 1, workers=args.workers)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+    results.to_csv(args.out, index_label='rank')
+    print(f"Ranked results written to {args.out}")
+    print(results.head(10).to_string())
+
+
+if __name__ == "__main__":
+    main()
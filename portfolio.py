@@ -0,0 +1,134 @@
+"""Materialized portfolio aggregates for the Streamlit wallet.
+
+Holdings, cost basis, realized P/L and the EUR balances are kept as rows in
+``app_state`` and adjusted in the same transaction as each deposit, buy or
+sell insert, so reading the portfolio never scans ``transactions``. Cost basis
+uses the average-cost method: a sell removes basis in proportion to the BTC
+sold.
+
+The aggregates can be verified or rebuilt from the raw tables:
+
+    python portfolio.py check
+    python portfolio.py rebuild
+"""
+import argparse
+import math
+import sqlite3
+import uuid
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+AGGREGATE_KEYS = ('btc_holdings', 'cost_basis', 'realized_pl', 'eur_balance', 'total_eur_deposited')
+
+SQL_INSERT_DEPOSIT = "INSERT INTO deposits (deposit_id, timestamp, ts_epoch, eur_deposited) VALUES (?, ?, ?, ?)"
+SQL_INSERT_TRANSACTION = "INSERT INTO transactions (transaction_id, timestamp, ts_epoch, type, price, eur_amount, btc_amount, conversion) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_ADD_STATE = "UPDATE app_state SET value = value + ? WHERE key = ?"
+SQL_SET_STATE = "INSERT OR REPLACE INTO app_state (key, value) VALUES (?, ?)"
+SQL_LOAD_AGGREGATES = "SELECT key, value FROM app_state WHERE key IN ({})".format(', '.join('?' * len(AGGREGATE_KEYS)))
+
+
+def load_aggregates(conn):
+    """Returns the stored aggregates as a dict (missing keys read as 0.0)."""
+    values = dict(conn.execute(SQL_LOAD_AGGREGATES, AGGREGATE_KEYS).fetchall())
+    return {key: values.get(key) or 0.0 for key in AGGREGATE_KEYS}
+
+
+def apply_trade(aggregates, eur_amount, btc_amount):
+    """Returns the aggregates after one trade; amounts are signed as stored in ``transactions``."""
+    result = dict(aggregates)
+    holdings = aggregates['btc_holdings']
+    if btc_amount >= 0:
+        result['cost_basis'] += -eur_amount
+    else:
+        fraction = min(-btc_amount / holdings, 1.0) if holdings > 0 else 0.0
+        basis_sold = aggregates['cost_basis'] * fraction
+        result['cost_basis'] -= basis_sold
+        result['realized_pl'] += eur_amount - basis_sold
+    result['btc_holdings'] = holdings + btc_amount
+    result['eur_balance'] += eur_amount
+    return result
+
+
+def record_deposit(conn, when, eur_deposited):
+    """Inserts a deposit made at datetime ``when`` and updates the balances; the caller owns the transaction."""
+    conn.execute(SQL_INSERT_DEPOSIT,
+                 (str(uuid.uuid4()), when.strftime(TIMESTAMP_FORMAT), int(when.timestamp()), eur_deposited))
+    conn.execute(SQL_ADD_STATE, (eur_deposited, 'eur_balance'))
+    conn.execute(SQL_ADD_STATE, (eur_deposited, 'total_eur_deposited'))
+    return load_aggregates(conn)
+
+
+def record_trade(conn, trade_type, when, price, eur_amount, btc_amount, conversion=None):
+    """Inserts a buy/sell made at datetime ``when`` and updates the aggregates; the caller owns the transaction.
+
+    ``conversion`` is the fx label if ``price`` was converted from USDT.
+    """
+    conn.execute(SQL_INSERT_TRANSACTION,
+                 (str(uuid.uuid4()), when.strftime(TIMESTAMP_FORMAT), int(when.timestamp()),
+                  trade_type, price, eur_amount, btc_amount, conversion))
+    aggregates = apply_trade(load_aggregates(conn), eur_amount, btc_amount)
+    conn.executemany(SQL_SET_STATE, aggregates.items())
+    return aggregates
+
+
+def compute_aggregates(conn):
+    """Recomputes the aggregates from scratch by replaying every deposit and trade."""
+    aggregates = dict.fromkeys(AGGREGATE_KEYS, 0.0)
+    total_deposited = conn.execute("SELECT COALESCE(SUM(eur_deposited), 0) FROM deposits").fetchone()[0]
+    aggregates['eur_balance'] = total_deposited
+    aggregates['total_eur_deposited'] = total_deposited
+    trades = conn.execute("SELECT eur_amount, btc_amount FROM transactions ORDER BY ts_epoch, rowid")
+    for eur_amount, btc_amount in trades:
+        aggregates = apply_trade(aggregates, eur_amount, btc_amount)
+    return aggregates
+
+
+def check(conn, rel_tol=1e-9, abs_tol=1e-8):
+    """Returns [(key, stored, expected)] for every aggregate that has drifted."""
+    stored = load_aggregates(conn)
+    expected = compute_aggregates(conn)
+    return [(key, stored[key], expected[key]) for key in AGGREGATE_KEYS
+            if not math.isclose(stored[key], expected[key], rel_tol=rel_tol, abs_tol=abs_tol)]
+
+
+def rebuild(conn):
+    aggregates = compute_aggregates(conn)
+    conn.executemany(SQL_SET_STATE, aggregates.items())
+    return aggregates
+
+
+def ensure_aggregates(conn):
+    """Builds the trade aggregates for databases created before they existed.
+
+    The EUR balances already existed and are left as stored; use ``check`` to
+    compare them against the raw tables.
+    """
+    trade_keys = ('btc_holdings', 'cost_basis', 'realized_pl')
+    present = conn.execute("SELECT COUNT(*) FROM app_state WHERE key IN (?, ?, ?)", trade_keys).fetchone()[0]
+    if present < len(trade_keys):
+        aggregates = compute_aggregates(conn)
+        conn.executemany(SQL_SET_STATE, [(key, aggregates[key]) for key in trade_keys])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild the materialized portfolio aggregates.")
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--db', default='bitcoin_tracker_streamlit.db')
+    args = parser.parse_args()
+
+    with sqlite3.connect(args.db) as conn:
+        if args.command == 'rebuild':
+            for key, value in rebuild(conn).items():
+                print(f"{key}: {value}")
+            return
+        mismatches = check(conn)
+    if not mismatches:
+        print("Aggregates are consistent.")
+        return
+    for key, stored, expected in mismatches:
+        print(f"{key}: stored {stored} != expected {expected}")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
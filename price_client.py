@@ -0,0 +1,404 @@
+"""Binance spot price client.
+
+Both variants keep one pooled keep-alive session, so a tick reuses an open
+TLS connection instead of paying for a new handshake. BTCEUR is requested
+first; if it fails, or has not answered within ``hedge_delay`` seconds, the
+BTCUSDT fallback is requested concurrently and whichever usable answer
+arrives is taken, preferring EUR: a BTCUSDT answer that lands first still
+gives the primary ``primary_grace`` seconds to finish. A BTCUSDT price is
+converted with the background-refreshed EURUSDT rate from fx.FxRate, and the
+returned Quote records which conversion was applied. Transient failures
+(connection errors, timeouts, 5xx and rate limiting) are retried with
+exponential backoff and full jitter; other 4xx answers are permanent and
+raised at once. A circuit breaker stops hammering the API (and stalling
+ticks) while it is down.
+
+``get_prices`` fetches a whole watchlist with one batched
+``ticker/price?symbols=[...]`` request instead of one request per symbol.
+Binance rejects the whole batch if any symbol is unknown, so symbols that
+exchangeInfo does not list as trading are left out of it.
+
+``base_url`` can point at a local stub server, e.g. ``http://127.0.0.1:8000``.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:  # only needed by AsyncPriceClient
+    aiohttp = None
+
+from fx import FX_SYMBOL, FxRate
+
+BINANCE_API_URL = "https://api.binance.com"
+TICKER_PATH = "/api/v3/ticker/price"
+EXCHANGE_INFO_PATH = "/api/v3/exchangeInfo"
+PRIMARY_SYMBOL = "BTCEUR"
+FALLBACK_SYMBOL = "BTCUSDT"
+# Static USDT -> EUR estimate, only used until the first live rate arrives
+USDT_TO_EUR = 0.92
+HEDGE_DELAY = 0.5
+# Extra wait for BTCEUR once a BTCUSDT answer is in, before settling for a converted price
+PRIMARY_GRACE = 0.5
+# Besides 5xx: rate limited, and IP-banned for ignoring rate limits
+RETRY_STATUSES = frozenset({418, 429})
+
+# ``conversion`` is None for a native EUR price, else the fx label that was applied
+Quote = namedtuple('Quote', ['price', 'conversion'])
+
+
+class PriceUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and lets a single
+    trial call through once ``reset_timeout`` seconds have passed."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Half-open: allow one trial; a failure re-opens for another timeout
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+def backoff_delay(attempt, base=0.2, cap=2.0):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _retryable_status(status):
+    return status >= 500 or status in RETRY_STATUSES
+
+
+def _rejected(error):
+    """Whether ``error`` is a permanent 4xx answer, e.g. for an unknown symbol."""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status', None)
+    return status is not None and 400 <= status < 500 and not _retryable_status(status)
+
+
+def _parse_price(data):
+    return float(data['price'])
+
+
+def _symbols_param(symbols):
+    # Binance expects a compact JSON array: symbols=["BTCEUR","ETHEUR"]
+    return json.dumps(list(symbols), separators=(',', ':'))
+
+
+def _parse_prices(data):
+    return {item['symbol']: float(item['price']) for item in data}
+
+
+def _parse_trading(data):
+    return {item['symbol'] for item in data['symbols'] if item['status'] == 'TRADING'}
+
+
+class PriceClient:
+    def __init__(self, base_url=BINANCE_API_URL, timeout=5, retries=2, hedge_delay=HEDGE_DELAY,
+                 primary_grace=PRIMARY_GRACE, breaker=None, usdt_rate=USDT_TO_EUR, fx=None):
+        """Without ``fx``, starts its own FxRate refreshing EURUSDT in the background."""
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self.primary_grace = primary_grace
+        self.breaker = breaker or CircuitBreaker()
+        self._trading = None    # symbols listed as trading; None until checked
+        self._check_listing = True
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="price-client")
+        self.fx = fx
+        if fx is None:
+            self.fx = FxRate(lambda: self.fetch_symbol(FX_SYMBOL), usdt_rate)
+            self.fx.start()
+
+    def _get(self, path, params=None):
+        """GETs an API path, retrying connection errors, timeouts, 5xx and rate limiting."""
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.ok:
+                    return response.json()
+                if attempt == self.retries or not _retryable_status(response.status_code):
+                    response.raise_for_status()
+            time.sleep(backoff_delay(attempt))
+
+    def fetch_symbol(self, symbol):
+        """Returns the last price for one symbol, retrying transient failures."""
+        return _parse_price(self._get(TICKER_PATH, {'symbol': symbol}))
+
+    def get_price(self):
+        return self.get_quote().price
+
+    def get_quote(self):
+        """Returns the BTC price in EUR as a Quote, falling back to BTCUSDT converted to EUR.
+
+        Raises PriceUnavailable if neither symbol could be fetched or the
+        circuit breaker is open.
+        """
+        if not self.breaker.allow():
+            raise PriceUnavailable("price API circuit open, skipping request")
+
+        primary = self._executor.submit(self.fetch_symbol, PRIMARY_SYMBOL)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if primary in done and primary.exception() is None:
+            self.breaker.record_success()
+            return Quote(primary.result(), None)
+
+        fallback = self._executor.submit(self.fetch_symbol, FALLBACK_SYMBOL)
+        pending = {primary, fallback}
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Prefer EUR when both finished in the same wake-up
+            for future in sorted(done, key=lambda f: f is not primary):
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                if future is fallback and primary in pending:
+                    # A slow but healthy primary still beats a converted price
+                    wait([primary], timeout=self.primary_grace)
+                    if primary.done() and primary.exception() is None:
+                        future = primary
+                self.breaker.record_success()
+                if future is primary:
+                    return Quote(future.result(), None)
+                rate, conversion = self.fx.current()
+                return Quote(future.result() * rate, conversion)
+
+        self.breaker.record_failure()
+        raise PriceUnavailable(f"all price requests failed: {errors[-1]}")
+
+    def fetch_symbols(self, symbols):
+        """Returns {symbol: price} for several symbols from one batched request."""
+        return _parse_prices(self._get(TICKER_PATH, {'symbols': _symbols_param(symbols)}))
+
+    def fetch_trading_symbols(self):
+        """Returns the set of symbols exchangeInfo lists as trading."""
+        return _parse_trading(self._get(EXCHANGE_INFO_PATH))
+
+    def _tradable(self, symbols):
+        # The listing is checked on the first batch and again after a rejected one;
+        # if it cannot be fetched, the last known listing (or none) is used
+        if self._check_listing:
+            self._check_listing = False
+            try:
+                self._trading = self.fetch_trading_symbols()
+            except Exception as e:
+                print(f"Error checking the symbol listing: {e}")
+        if self._trading is None:
+            return list(symbols)
+        return [symbol for symbol in symbols if symbol in self._trading]
+
+    def get_prices(self, symbols):
+        """Returns {symbol: Quote} for the watchlist from a single request.
+
+        Symbols that are not trading are left out, so callers must treat
+        symbols missing from the result as unavailable. If the batch fails but
+        includes PRIMARY_SYMBOL, the primary price is still returned through
+        get_quote's fallback, so the main chart keeps updating. Raises
+        PriceUnavailable otherwise.
+        """
+        if not self.breaker.allow():
+            raise PriceUnavailable("price API circuit open, skipping request")
+        tradable = self._tradable(symbols)
+        try:
+            prices = self.fetch_symbols(tradable) if tradable else {}
+        except Exception as e:
+            self.breaker.record_failure()
+            if _rejected(e):
+                self._check_listing = True
+            if PRIMARY_SYMBOL not in symbols:
+                raise PriceUnavailable(f"batched price request failed: {e}")
+            return {PRIMARY_SYMBOL: self.get_quote()}
+        self.breaker.record_success()
+        return {symbol: Quote(price, None) for symbol, price in prices.items()}
+
+    def close(self):
+        self.fx.stop()
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+class AsyncPriceClient:
+    """asyncio counterpart of PriceClient, built on a shared aiohttp session.
+
+    Pass the ``fx`` of a running PriceClient to share its live rate; without
+    it the client refreshes its own EURUSDT rate in a task on the event loop,
+    started with the first request.
+    """
+
+    def __init__(self, base_url=BINANCE_API_URL, timeout=5, retries=2, hedge_delay=HEDGE_DELAY,
+                 primary_grace=PRIMARY_GRACE, breaker=None, usdt_rate=USDT_TO_EUR, fx=None):
+        if aiohttp is None:
+            raise ImportError("AsyncPriceClient requires aiohttp")
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self.primary_grace = primary_grace
+        self.breaker = breaker or CircuitBreaker()
+        self.fx = fx or FxRate(None, usdt_rate)
+        self._own_fx = fx is None
+        self._fx_task = None
+        self._trading = None
+        self._check_listing = True
+        self._session = None
+
+    async def _get_session(self):
+        if self._own_fx and self._fx_task is None:
+            self._fx_task = asyncio.ensure_future(self._refresh_fx())
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _refresh_fx(self):
+        while True:
+            try:
+                self.fx.update(await self.fetch_symbol(FX_SYMBOL))
+            except Exception as e:
+                print(f"Error refreshing EUR rate: {e}")
+            await asyncio.sleep(self.fx.refresh_interval)
+
+    async def _get(self, path, params=None):
+        session = await self._get_session()
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status < 400:
+                        return await response.json(content_type=None)
+                    if attempt == self.retries or not _retryable_status(response.status):
+                        response.raise_for_status()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def fetch_symbol(self, symbol):
+        return _parse_price(await self._get(TICKER_PATH, {'symbol': symbol}))
+
+    async def get_price(self):
+        return (await self.get_quote()).price
+
+    async def get_quote(self):
+        if not self.breaker.allow():
+            raise PriceUnavailable("price API circuit open, skipping request")
+
+        primary = asyncio.ensure_future(self.fetch_symbol(PRIMARY_SYMBOL))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+        if primary in done and primary.exception() is None:
+            self.breaker.record_success()
+            return Quote(primary.result(), None)
+
+        fallback = asyncio.ensure_future(self.fetch_symbol(FALLBACK_SYMBOL))
+        pending = {primary, fallback}
+        errors = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: t is not primary):
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                    continue
+                if task is fallback and primary in pending:
+                    await asyncio.wait({primary}, timeout=self.primary_grace)
+                    if primary.done() and primary.exception() is None:
+                        task = primary
+                        pending.discard(primary)
+                for other in pending:
+                    other.cancel()
+                self.breaker.record_success()
+                if task is primary:
+                    return Quote(task.result(), None)
+                rate, conversion = self.fx.current()
+                return Quote(task.result() * rate, conversion)
+
+        self.breaker.record_failure()
+        raise PriceUnavailable(f"all price requests failed: {errors[-1]}")
+
+    async def fetch_symbols(self, symbols):
+        return _parse_prices(await self._get(TICKER_PATH, {'symbols': _symbols_param(symbols)}))
+
+    async def fetch_trading_symbols(self):
+        return _parse_trading(await self._get(EXCHANGE_INFO_PATH))
+
+    async def _tradable(self, symbols):
+        if self._check_listing:
+            self._check_listing = False
+            try:
+                self._trading = await self.fetch_trading_symbols()
+            except Exception as e:
+                print(f"Error checking the symbol listing: {e}")
+        if self._trading is None:
+            return list(symbols)
+        return [symbol for symbol in symbols if symbol in self._trading]
+
+    async def get_prices(self, symbols):
+        if not self.breaker.allow():
+            raise PriceUnavailable("price API circuit open, skipping request")
+        tradable = await self._tradable(symbols)
+        try:
+            prices = await self.fetch_symbols(tradable) if tradable else {}
+        except Exception as e:
+            self.breaker.record_failure()
+            if _rejected(e):
+                self._check_listing = True
+            if PRIMARY_SYMBOL not in symbols:
+                raise PriceUnavailable(f"batched price request failed: {e}")
+            return {PRIMARY_SYMBOL: await self.get_quote()}
+        self.breaker.record_success()
+        return {symbol: Quote(price, None) for symbol, price in prices.items()}
+
+    async def close(self):
+        if self._fx_task is not None:
+            self._fx_task.cancel()
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,160 @@
+"""Streaming price feed from Binance WebSocket market streams.
+
+Instead of polling the REST ticker, a background thread consumes a ``trade``
+or ``bookTicker`` stream and hands every price to a callback, the same way the
+polling loops feed the buffers and indicators. Dropped connections are
+reconnected with backoff, and trade-id jumps (or reconnects) are reported as
+gaps.
+
+The transport is pluggable: anything with ``connect(url)`` returning an object
+with ``recv(timeout)`` and ``close()`` works, so a local replay server (or an
+in-memory fake) can drive the stream in tests.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+from price_client import backoff_delay
+
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:  # only needed by WebSocketTransport
+    ws_connect = None
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443/ws"
+
+
+class WebSocketTransport:
+    """Default transport on the ``websockets`` package's synchronous client."""
+
+    def connect(self, url):
+        if ws_connect is None:
+            raise ImportError("streaming mode requires the websockets package")
+        return ws_connect(url, open_timeout=10, close_timeout=2)
+
+
+def parse_message(raw):
+    """Returns (price, datetime, trade_id) from a trade or bookTicker message.
+
+    bookTicker updates are priced at the bid/ask midpoint and carry no trade
+    id. Messages that are neither (e.g. subscription acks) return None.
+    """
+    data = json.loads(raw)
+    if data.get('e') == 'trade':
+        return float(data['p']), datetime.fromtimestamp(data['T'] / 1000), data['t']
+    if 'b' in data and 'a' in data:
+        return (float(data['b']) + float(data['a'])) / 2, datetime.now(), None
+    return None
+
+
+class PriceStream:
+    def __init__(self, on_price, symbol='BTCEUR', stream='trade', url=BINANCE_WS_URL,
+                 transport=None, on_gap=None, min_interval=0.0, recv_timeout=30):
+        self.on_price = on_price
+        self.on_gap = on_gap
+        self.url = f"{url.rstrip('/')}/{symbol.lower()}@{stream}"
+        self.transport = transport or WebSocketTransport()
+        # Trades can arrive many times a second; deliver at most one price per
+        # min_interval to keep downstream work bounded. Trades inside the
+        # interval are coalesced: the newest is held back and delivered once
+        # the interval expires, even if no further trade arrives.
+        self.min_interval = min_interval
+        self.recv_timeout = recv_timeout
+
+        self.connected = False
+        self.reconnects = 0
+        self.gaps = 0
+        self._last_trade_id = None
+        self._last_delivery = 0.0
+        self._pending = None    # newest throttled (price, timestamp)
+        self._running = False
+        self._thread = None
+        self._conn = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self.run, name="price-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+    def run(self):
+        attempt = 0
+        while self._running:
+            try:
+                self._conn = self.transport.connect(self.url)
+                self.connected = True
+                attempt = 0
+                while self._running:
+                    try:
+                        raw = self._conn.recv(timeout=self._recv_timeout())
+                    except TimeoutError:
+                        if self._pending is None:
+                            raise
+                        self.flush()
+                        continue
+                    self.handle_message(raw)
+            except Exception as e:
+                if not self._running:
+                    break
+                print(f"Price stream error, reconnecting: {e}")
+            finally:
+                self.connected = False
+                if self._conn is not None:
+                    try:
+                        self._conn.close()
+                    except Exception:
+                        pass
+            if self._running:
+                self.reconnects += 1
+                # A price held back on the dead connection is stale by now
+                self._pending = None
+                self._report_gap(None)
+                time.sleep(backoff_delay(attempt, base=0.5, cap=30.0))
+                attempt += 1
+
+    def handle_message(self, raw):
+        parsed = parse_message(raw)
+        if parsed is None:
+            return
+        price, timestamp, trade_id = parsed
+        if trade_id is not None:
+            if self._last_trade_id is not None and trade_id > self._last_trade_id + 1:
+                self._report_gap(trade_id - self._last_trade_id - 1)
+            self._last_trade_id = trade_id
+
+        if time.monotonic() - self._last_delivery < self.min_interval:
+            self._pending = (price, timestamp)
+            return
+        self._pending = None
+        self._deliver(price, timestamp)
+
+    def flush(self):
+        """Delivers the newest throttled price, if one is held back."""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._deliver(*pending)
+
+    def _deliver(self, price, timestamp):
+        self._last_delivery = time.monotonic()
+        self.on_price(price, timestamp)
+
+    def _recv_timeout(self):
+        # Wake up when a held-back price is due rather than waiting for the next trade
+        if self._pending is None:
+            return self.recv_timeout
+        return max(0.0, self._last_delivery + self.min_interval - time.monotonic())
+
+    def _report_gap(self, missed):
+        """``missed`` is the number of skipped trades, or None after a reconnect."""
+        self.gaps += 1
+        if self.on_gap is not None:
+            self.on_gap(missed)
+
@@ -0,0 +1,107 @@
+"""Fixed-capacity ring buffer for aligned time series.
+
+All columns share one write position, so a row (timestamp, price, rsi, ...)
+is appended atomically and the series can never drift out of alignment.
+Storage is allocated twice over and every value is written to slot ``i`` and
+``i + capacity``; the live window is then always a single contiguous slice, so
+ordered views are handed out without copying or reshuffling.
+"""
+import math
+
+import numpy as np
+
+SERIES_COLUMNS = ('price', 'rsi', 'sma20', 'sma50')
+
+
+class RingBuffer:
+    def __init__(self, capacity, columns=SERIES_COLUMNS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+        self._times = np.empty(2 * capacity, dtype='datetime64[us]')
+        self._values = np.full((len(self.columns), 2 * capacity), np.nan)
+        self._start = 0
+        self._size = 0
+        # Bumped on every append or in-place change.
+        self.version = 0
+        # Rows ever appended; the window holds rows appended - len .. appended - 1
+        self.appended = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def full(self):
+        return self._size == self.capacity
+
+    def append(self, timestamp, **values):
+        """Appends one row, overwriting the oldest once the buffer is full.
+
+        Columns not given are stored as NaN.
+        """
+        if self._size < self.capacity:
+            pos = self._start + self._size
+            self._size += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+        mirror = pos + self.capacity
+
+        ts = np.datetime64(timestamp, 'us')
+        self._times[pos] = ts
+        self._times[mirror] = ts
+        self._values[:, pos] = np.nan
+        for name, value in values.items():
+            self._values[self._column_index[name], pos] = value
+        self._values[:, mirror] = self._values[:, pos]
+        self.version += 1
+        self.appended += 1
+
+    def set_last(self, **values):
+        """Overwrites columns of the newest row in place, e.g. a candle still forming."""
+        if self._size == 0:
+            raise IndexError("set_last on an empty RingBuffer")
+        pos = (self._start + self._size - 1) % self.capacity
+        for name, value in values.items():
+            row = self._column_index[name]
+            self._values[row, pos] = value
+            self._values[row, pos + self.capacity] = value
+        self.version += 1
+
+    def times(self):
+        """Ordered datetime64 view of the window, oldest first.
+
+        Like all views returned here, it is only valid until the next append.
+        """
+        return self._times[self._start:self._start + self._size]
+
+    def column(self, name):
+        """Ordered float64 view of one column, oldest first."""
+        return self._values[self._column_index[name], self._start:self._start + self._size]
+
+    __getitem__ = column
+
+    def last(self, name, default=math.nan):
+        if self._size == 0:
+            return default
+        return float(self._values[self._column_index[name], self._start + self._size - 1])
+
+    def last_time(self):
+        if self._size == 0:
+            return None
+        return self._times[self._start + self._size - 1]
+
+    def copy(self):
+        """Independent copy with the same contents and version."""
+        other = RingBuffer.__new__(RingBuffer)
+        other.__dict__.update(self.__dict__)
+        other._times = self._times.copy()
+        other._values = self._values.copy()
+        return other
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+        self.version += 1
@@ -0,0 +1,57 @@
+"""Trading signal rules shared by the apps and the backtester.
+
+``classify`` evaluates the RSI/SMA rules for one tick and ``classify_array``
+evaluates exactly the same rules over whole arrays with ``np.select``, so a
+backtest measures the signal the apps actually show. The apps map the codes
+to their own messages and colors.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+STRONG_SELL, SELL, HOLD, BUY, STRONG_BUY = -2, -1, 0, 1, 2
+
+SignalRules = namedtuple('SignalRules', [
+    'strong_buy_rsi',    # RSI below this, SMA20 > SMA50 and price > SMA50
+    'strong_sell_rsi',   # RSI above this, SMA20 < SMA50 and price < SMA50
+    'buy_rsi',           # RSI below this and price > SMA20
+    'sell_rsi',          # RSI above this and price < SMA20
+])
+DEFAULT_RULES = SignalRules(strong_buy_rsi=30, strong_sell_rsi=70, buy_rsi=35, sell_rsi=65)
+
+SIGNAL_NAMES = {
+    STRONG_BUY: "Strong buy",
+    BUY: "Buy",
+    HOLD: "Hold",
+    SELL: "Sell",
+    STRONG_SELL: "Strong sell",
+}
+
+
+def classify(rsi, price, sma20, sma50, rules=DEFAULT_RULES):
+    """Signal code for one tick; None if an indicator is not available yet."""
+    if math.isnan(rsi) or math.isnan(sma20) or math.isnan(sma50):
+        return None
+    if rsi < rules.strong_buy_rsi and sma20 > sma50 and price > sma50:
+        return STRONG_BUY
+    if rsi > rules.strong_sell_rsi and sma20 < sma50 and price < sma50:
+        return STRONG_SELL
+    if rsi < rules.buy_rsi and price > sma20:
+        return BUY
+    if rsi > rules.sell_rsi and price < sma20:
+        return SELL
+    return HOLD
+
+
+def classify_array(rsi, price, sma20, sma50, rules=DEFAULT_RULES):
+    """Signal codes for whole arrays; HOLD where an indicator is NaN."""
+    # Comparisons with NaN are False, so warm-up rows fall through to HOLD
+    with np.errstate(invalid='ignore'):
+        conditions = [
+            (rsi < rules.strong_buy_rsi) & (sma20 > sma50) & (price > sma50),
+            (rsi > rules.strong_sell_rsi) & (sma20 < sma50) & (price < sma50),
+            (rsi < rules.buy_rsi) & (price > sma20),
+            (rsi > rules.sell_rsi) & (price < sma20),
+        ]
+    return np.select(conditions, [STRONG_BUY, STRONG_SELL, BUY, SELL], HOLD).astype(np.int8)
@@ -0,0 +1,132 @@
+"""Kline backfill against recorded candles (FixtureFetcher) and a temporary cache.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backfill
+from backfill import Backfiller, FixtureFetcher, KlineCache, RateLimiter, missing_pages, seed_history
+
+STEP = backfill.INTERVAL_MS['1s']
+
+
+def klines(start_ms, count, step=STEP):
+    """Candles whose close is their index, so samples are easy to check."""
+    return [[start_ms + i * step, i, i, i, float(i), 1.0] for i in range(count)]
+
+
+class MissingPagesTest(unittest.TestCase):
+    def test_only_uncovered_ranges(self):
+        cached = np.array([3, 4, 5, 8], dtype=np.int64) * STEP
+        self.assertEqual(missing_pages(cached, 0, 10 * STEP, STEP),
+                         [(0, 2 * STEP), (6 * STEP, 7 * STEP), (9 * STEP, 10 * STEP)])
+
+    def test_fully_cached(self):
+        cached = np.arange(0, 11 * STEP, STEP, dtype=np.int64)
+        self.assertEqual(missing_pages(cached, 0, 10 * STEP, STEP), [])
+
+    def test_runs_split_into_pages(self):
+        pages = missing_pages(np.array([], dtype=np.int64), 0, 9 * STEP, STEP, page_limit=4)
+        self.assertEqual(pages, [(0, 3 * STEP), (4 * STEP, 7 * STEP), (8 * STEP, 9 * STEP)])
+
+
+class BackfillerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cache = KlineCache(os.path.join(directory, 'klines.db'))
+        self.addCleanup(self.cache.close)
+        # Ten minutes of closed 1s candles, ending well before now
+        self.start_ms = (int(time.time()) - 3600) * 1000
+        self.fetcher = FixtureFetcher(klines(self.start_ms, 600))
+
+    def test_second_run_is_served_from_cache(self):
+        end_ms = self.start_ms + 599 * STEP
+        first = Backfiller(self.cache, self.fetcher)
+        self.assertEqual(first.backfill('BTCEUR', '1s', self.start_ms, end_ms), 600)
+        calls = self.fetcher.calls
+
+        second = Backfiller(self.cache, self.fetcher)
+        rows = second.candles('BTCEUR', '1s', self.start_ms, end_ms)
+        self.assertEqual(self.fetcher.calls, calls)
+        self.assertEqual(len(rows), 600)
+        self.assertEqual([r[0] for r in rows], [k[0] for k in self.fetcher.klines])
+
+    def test_only_missing_range_is_fetched(self):
+        backfiller = Backfiller(self.cache, self.fetcher)
+        backfiller.backfill('BTCEUR', '1s', self.start_ms, self.start_ms + 99 * STEP)
+        calls = self.fetcher.calls
+        self.assertEqual(backfiller.backfill('BTCEUR', '1s', self.start_ms, self.start_ms + 199 * STEP), 100)
+        self.assertEqual(self.fetcher.calls, calls + 1)
+
+    def test_seed_history_samples_at_cadence(self):
+        backfiller = Backfiller(self.cache, self.fetcher)
+        first_tick = datetime.fromtimestamp((self.start_ms + 600 * STEP) / 1000)
+        ticks = [(first_tick, 1000.0)]
+        seeded = seed_history(ticks, 5, backfiller, cadence=3)
+
+        self.assertEqual(len(seeded), 5)
+        self.assertEqual(seeded[-1], ticks[0])
+        history = seeded[:-1]
+        # The newest closed candle before the first tick, then every third one before it
+        self.assertEqual([price for _, price in history], [590.0, 593.0, 596.0, 599.0])
+        self.assertTrue(all((b[0] - a[0]).total_seconds() == 3 for a, b in zip(history, history[1:])))
+        self.assertLess(history[-1][0], first_tick)
+
+    def test_seed_history_skips_sub_second_cadence(self):
+        backfiller = Backfiller(self.cache, self.fetcher)
+        ticks = [(datetime.now(), 1000.0)]
+        self.assertIs(seed_history(ticks, 5, backfiller, cadence=0.2), ticks)
+        self.assertEqual(self.fetcher.calls, 0)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(6_000_000.0 + 15)   # 15 s into a minute
+        patcher = mock.patch.object(backfill, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_waits_for_next_minute_once_budget_is_spent(self):
+        limiter = RateLimiter(limit_per_minute=10)
+        limiter.acquire(4)
+        limiter.acquire(4)
+        self.assertEqual(self.clock.sleeps, [])
+        limiter.acquire(4)
+        self.assertEqual(self.clock.sleeps, [45.0])
+
+    def test_reported_weight_is_respected(self):
+        limiter = RateLimiter(limit_per_minute=10)
+        limiter.update(9)
+        limiter.acquire(1)
+        self.assertEqual(self.clock.sleeps, [])
+        limiter.acquire(1)
+        self.assertEqual(self.clock.sleeps, [45.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
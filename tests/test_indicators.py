@@ -0,0 +1,66 @@
+"""Streaming indicators against their vectorized counterparts.
+
+    python -m unittest discover tests
+"""
+import math
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators
+from benchmarks.synthetic import gbm_with_jumps
+
+
+def stream(indicator, prices):
+    return np.array([indicator.update(float(p)) for p in prices])
+
+
+class StreamingIndicatorTest(unittest.TestCase):
+    def setUp(self):
+        # Long enough for StreamingSMA to re-sum its window more than once
+        self.prices = gbm_with_jumps(2 * indicators.SMA_RESUM_INTERVAL + 5_000, seed=3)
+
+    def test_sma_matches_vectorized(self):
+        for period in (20, 50):
+            streamed = stream(indicators.StreamingSMA(period), self.prices)
+            expected = indicators.sma(self.prices, period)
+            np.testing.assert_array_equal(np.isnan(streamed), np.isnan(expected))
+            np.testing.assert_allclose(streamed[period - 1:], expected[period - 1:], rtol=1e-12)
+
+    def test_rsi_matches_vectorized(self):
+        streamed = stream(indicators.StreamingRSI(14), self.prices)
+        expected = indicators.rsi(self.prices, 14)
+        np.testing.assert_array_equal(np.isnan(streamed), np.isnan(expected))
+        np.testing.assert_allclose(streamed[14:], expected[14:], rtol=1e-9)
+
+    def test_warm_up_boundary(self):
+        sma = indicators.StreamingSMA(20)
+        values = stream(sma, self.prices[:20])
+        self.assertTrue(np.isnan(values[:19]).all())
+        self.assertAlmostEqual(values[19], self.prices[:20].mean(), places=6)
+
+        rsi = indicators.StreamingRSI(14)
+        values = stream(rsi, self.prices[:15])
+        self.assertTrue(np.isnan(values[:14]).all())
+        self.assertFalse(math.isnan(values[14]))
+
+    def test_flat_series(self):
+        # No gains and no losses: talib reports 0 instead of dividing by zero
+        flat = np.full(100, 60_000.0)
+        self.assertEqual(stream(indicators.StreamingRSI(14), flat)[-1], 0.0)
+        self.assertEqual(indicators.rsi(flat)[-1], 0.0)
+        self.assertEqual(stream(indicators.StreamingSMA(20), flat)[-1], 60_000.0)
+
+    def test_rising_series(self):
+        # Zero average loss: RSI saturates at 100
+        rising = np.arange(100, dtype=float) + 60_000.0
+        self.assertEqual(stream(indicators.StreamingRSI(14), rising)[-1], 100.0)
+        self.assertEqual(indicators.rsi(rising)[-1], 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""PriceClient against a local stub of the Binance price endpoints.
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fx import FxRate
+from price_client import PriceClient, Quote
+
+RATE = 0.9
+
+
+class StubBinance:
+    """Serves /api/v3/ticker/price from ``routes``: {symbol: (status, price, delay seconds)}.
+
+    A symbols=[...] batch answers 400 if any symbol has no route, as Binance does.
+    /api/v3/exchangeInfo lists the routed symbols as trading.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.hits = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/api/v3/exchangeInfo':
+                    stub.hits['exchangeInfo'] = stub.hits.get('exchangeInfo', 0) + 1
+                    self._send(200, {'symbols': [{'symbol': s, 'status': 'TRADING'} for s in stub.routes]})
+                    return
+                query = parse_qs(url.query)
+                symbols = json.loads(query['symbols'][0]) if 'symbols' in query else query['symbol']
+                for symbol in symbols:
+                    stub.hits[symbol] = stub.hits.get(symbol, 0) + 1
+                unknown = [s for s in symbols if s not in stub.routes]
+                if unknown:
+                    self._send(400, {'code': -1121, 'msg': 'Invalid symbol.'})
+                    return
+                status, price, delay = stub.routes[symbols[0]]
+                time.sleep(delay)
+                if status != 200:
+                    self._send(status, {'code': -1000, 'msg': 'stub error'})
+                elif 'symbols' in query:
+                    self._send(200, [{'symbol': s, 'price': str(stub.routes[s][1])} for s in symbols])
+                else:
+                    self._send(200, {'symbol': symbols[0], 'price': str(price)})
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class PriceClientTest(unittest.TestCase):
+    def client(self, routes, **kwargs):
+        stub = StubBinance(routes)
+        self.addCleanup(stub.close)
+        client = PriceClient(base_url=stub.url, timeout=2, fx=FxRate(None, RATE), **kwargs)
+        self.addCleanup(client.close)
+        return stub, client
+
+    def test_primary_price(self):
+        _, client = self.client({'BTCEUR': (200, 60000.0, 0)})
+        self.assertEqual(client.get_quote(), Quote(60000.0, None))
+
+    def test_fallback_is_converted(self):
+        _, client = self.client({'BTCEUR': (503, 0, 0), 'BTCUSDT': (200, 65000.0, 0)})
+        quote = client.get_quote()
+        self.assertAlmostEqual(quote.price, 65000.0 * RATE)
+        self.assertEqual(quote.conversion, f"static:{RATE:.6f}")
+
+    def test_server_errors_are_retried(self):
+        stub, client = self.client({'BTCEUR': (503, 0, 0)}, retries=2)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.fetch_symbol('BTCEUR')
+        self.assertEqual(stub.hits['BTCEUR'], 3)
+
+    def test_client_errors_are_not_retried(self):
+        stub, client = self.client({'BTCEUR': (400, 0, 0)}, retries=2)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.fetch_symbol('BTCEUR')
+        self.assertEqual(stub.hits['BTCEUR'], 1)
+
+    def test_unlisted_symbol_is_left_out_of_batch(self):
+        stub, client = self.client({'BTCEUR': (200, 60000.0, 0), 'ETHEUR': (200, 3000.0, 0)})
+        for _ in range(2):
+            quotes = client.get_prices(['BTCEUR', 'ETHEUR', 'NOPEEUR'])
+        self.assertEqual(quotes, {'BTCEUR': Quote(60000.0, None), 'ETHEUR': Quote(3000.0, None)})
+        self.assertEqual(stub.hits['exchangeInfo'], 1)
+        self.assertNotIn('NOPEEUR', stub.hits)
+
+    def test_rejected_batch_falls_back_to_primary_and_rechecks_listing(self):
+        stub, client = self.client({'BTCEUR': (200, 60000.0, 0), 'ETHEUR': (200, 3000.0, 0)})
+        client.get_prices(['BTCEUR', 'ETHEUR'])
+        del stub.routes['ETHEUR']    # delisted after the listing was checked
+        self.assertEqual(client.get_prices(['BTCEUR', 'ETHEUR']), {'BTCEUR': Quote(60000.0, None)})
+        self.assertEqual(stub.hits['ETHEUR'], 2)     # the 400 was not retried
+        self.assertEqual(client.get_prices(['BTCEUR', 'ETHEUR']), {'BTCEUR': Quote(60000.0, None)})
+        self.assertEqual(stub.hits['exchangeInfo'], 2)
+        self.assertEqual(stub.hits['ETHEUR'], 2)
+
+    def test_slow_primary_beats_fallback_within_grace(self):
+        _, client = self.client({'BTCEUR': (200, 60000.0, 0.4), 'BTCUSDT': (200, 65000.0, 0)},
+                                hedge_delay=0.1, primary_grace=1.0)
+        self.assertEqual(client.get_quote(), Quote(60000.0, None))
+
+    def test_fallback_taken_after_grace(self):
+        _, client = self.client({'BTCEUR': (200, 60000.0, 1.0), 'BTCUSDT': (200, 65000.0, 0)},
+                                hedge_delay=0.1, primary_grace=0.1)
+        self.assertEqual(client.get_quote().price, 65000.0 * RATE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""PriceStream driven by an in-memory transport.
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import queue
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_stream import PriceStream, parse_message
+
+TRADE_TIME_MS = 1_700_000_000_000
+
+
+def trade(trade_id, price):
+    return json.dumps({'e': 'trade', 's': 'BTCEUR', 't': trade_id, 'p': str(price),
+                       'T': TRADE_TIME_MS + trade_id})
+
+
+class FakeConnection:
+    """Replays ``script`` items: message strings are received, exceptions raised.
+
+    Once the script runs out, recv blocks like a quiet socket until its
+    timeout (TimeoutError) or until the connection is closed.
+    """
+
+    def __init__(self, script):
+        self._items = queue.Queue()
+        for item in script:
+            self._items.put(item)
+
+    def recv(self, timeout):
+        try:
+            item = self._items.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def close(self):
+        self._items.put(ConnectionError("closed"))
+
+
+class FakeTransport:
+    """Hands out one FakeConnection per connect, from a list of scripts."""
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.urls = []
+
+    def connect(self, url):
+        self.urls.append(url)
+        return FakeConnection(self.scripts.pop(0) if self.scripts else [])
+
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class PriceStreamTest(unittest.TestCase):
+    def stream(self, transport, **kwargs):
+        self.prices = []
+        self.gaps = []
+        stream = PriceStream(lambda price, timestamp: self.prices.append((price, timestamp)),
+                             transport=transport, on_gap=self.gaps.append, **kwargs)
+        self.addCleanup(stream.stop)
+        stream.start()
+        return stream
+
+    def test_parse_trade_and_book_ticker(self):
+        price, timestamp, trade_id = parse_message(trade(7, 60000.5))
+        self.assertEqual((price, trade_id), (60000.5, 7))
+        self.assertEqual(timestamp.timestamp(), (TRADE_TIME_MS + 7) / 1000)
+        price, _, trade_id = parse_message(json.dumps({'u': 1, 'b': '100.0', 'a': '102.0'}))
+        self.assertEqual((price, trade_id), (101.0, None))
+        self.assertIsNone(parse_message(json.dumps({'result': None, 'id': 1})))
+
+    def test_url_names_symbol_and_stream(self):
+        transport = FakeTransport([])
+        self.stream(transport, symbol='ETHEUR', stream='bookTicker', url='ws://localhost:9000/ws/')
+        self.assertTrue(wait_until(lambda: transport.urls))
+        self.assertEqual(transport.urls[0], 'ws://localhost:9000/ws/etheur@bookTicker')
+
+    def test_throttled_trades_coalesce_and_flush(self):
+        self.stream(FakeTransport([trade(i, 100 + i) for i in range(1, 6)]),
+                    min_interval=0.2, recv_timeout=5)
+        # The first trade goes straight through; the newest of the rest once the interval expires
+        self.assertTrue(wait_until(lambda: len(self.prices) == 2))
+        self.assertEqual([price for price, _ in self.prices], [101.0, 105.0])
+        time.sleep(0.3)
+        self.assertEqual(len(self.prices), 2)
+
+    def test_trade_id_gap_is_reported(self):
+        stream = self.stream(FakeTransport([trade(1, 100), trade(2, 101), trade(5, 102)]), recv_timeout=5)
+        self.assertTrue(wait_until(lambda: len(self.prices) == 3))
+        self.assertEqual(self.gaps, [2])
+        self.assertEqual(stream.gaps, 1)
+
+    def test_reconnect_reports_gap_and_drops_pending_trade(self):
+        first = [trade(1, 100), trade(2, 101), ConnectionError("dropped")]
+        stream = self.stream(FakeTransport(first, [trade(3, 103)]), min_interval=0.5, recv_timeout=5)
+        self.assertTrue(wait_until(lambda: stream.reconnects == 1 and len(self.prices) == 2))
+        self.assertIn(None, self.gaps)
+        # Trade 2 was held back on the dropped connection and must not resurface
+        time.sleep(0.6)
+        self.assertEqual([price for price, _ in self.prices], [100.0, 103.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
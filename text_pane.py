@@ -0,0 +1,33 @@
+"""Append-only Tk text pane with a bounded number of lines.
+
+Rewriting a whole Text widget on every tick means deleting and re-inserting
+(and re-formatting) every visible line. A ``TextPane`` only inserts the
+lines that are new and deletes the same number from the top, so a tick
+costs one insert and at most one delete however many lines are shown.
+"""
+import tkinter as tk
+
+
+class TextPane:
+    def __init__(self, widget, max_lines):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.lines = 0
+
+    def append(self, lines):
+        """Adds newline-terminated ``lines`` at the bottom, dropping the oldest past ``max_lines``."""
+        if not lines:
+            return
+        if len(lines) >= self.max_lines:
+            self.clear()
+            lines = lines[-self.max_lines:]
+        self.widget.insert(tk.END, ''.join(lines))
+        self.lines += len(lines)
+        excess = self.lines - self.max_lines
+        if excess > 0:
+            self.widget.delete('1.0', f'{excess + 1}.0')
+            self.lines -= excess
+
+    def clear(self):
+        self.widget.delete('1.0', tk.END)
+        self.lines = 0
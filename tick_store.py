@@ -0,0 +1,77 @@
+"""Append-only on-disk log of price ticks.
+
+Ticks are buffered in memory and written in batches with ``executemany``, so
+persisting them costs one small transaction every few seconds rather than a
+commit per tick. On startup the most recent ticks are read back and replayed
+through the indicators, so a restart does not leave the trading signal blind
+while the 50-tick SMA window refills.
+"""
+import threading
+import time
+from datetime import datetime
+
+import metrics
+from db import ConnectionPool
+from migrations import TICKS_MIGRATIONS, migrate
+
+FLUSH_BATCH_SIZE = 50
+FLUSH_INTERVAL_SECONDS = 10
+RETENTION_ROWS = 200_000
+# Older ticks are not replayed: indicators built across a long outage would mislead
+WARM_START_MAX_AGE_SECONDS = 3600
+
+SQL_INSERT_TICK = "INSERT INTO ticks (ts_ms, price, conversion) VALUES (?, ?, ?)"
+SQL_RECENT_TICKS = "SELECT ts_ms, price FROM ticks WHERE ts_ms >= ? ORDER BY ts_ms DESC LIMIT ?"
+SQL_PRUNE_TICKS = "DELETE FROM ticks WHERE rowid <= (SELECT MAX(rowid) FROM ticks) - ?"
+
+
+class TickStore:
+    def __init__(self, db_name, batch_size=FLUSH_BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL_SECONDS, retention=RETENTION_ROWS):
+        """Each app keeps its own ``db_name``: replayed ticks must match the cadence they are replayed into."""
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.pool = ConnectionPool(db_name, size=1)
+        with self.pool.connection() as conn:
+            migrate(conn, TICKS_MIGRATIONS)
+
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, price, conversion=None):
+        """Queues one tick; the batch is written once it is big or old enough.
+
+        ``conversion`` is the fx label of a converted price (see fx.py).
+        """
+        with self._lock:
+            self._pending.append((int(timestamp.timestamp() * 1000), price, conversion))
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not batch:
+            return
+        try:
+            with metrics.DB_SECONDS.labels('tick_flush').time(), self.pool.transaction() as conn:
+                conn.executemany(SQL_INSERT_TICK, batch)
+                conn.execute(SQL_PRUNE_TICKS, (self.retention,))
+        except Exception as e:
+            print(f"Error writing ticks: {e}")
+
+    def recent(self, limit, max_age=WARM_START_MAX_AGE_SECONDS):
+        """Returns up to ``limit`` of the newest stored (datetime, price) ticks, oldest first."""
+        since = 0 if max_age is None else int((time.time() - max_age) * 1000)
+        with metrics.DB_SECONDS.labels('tick_recent').time(), self.pool.connection() as conn:
+            rows = conn.execute(SQL_RECENT_TICKS, (since, limit)).fetchall()
+        return [(datetime.fromtimestamp(ts_ms / 1000), price) for ts_ms, price in reversed(rows)]
+
+    def close(self):
+        self.flush()
+        self.pool.close()
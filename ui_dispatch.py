@@ -0,0 +1,65 @@
+"""Hands state from worker threads to the Tk main loop.
+
+Tk widgets may only be touched from the thread running ``mainloop``. Price
+workers therefore ``publish`` immutable snapshots into a queue, and the main
+loop drains it on an ``after()`` timer at a bounded frame rate. Everything
+queued since the previous frame is coalesced: only the newest snapshot is
+applied, so a burst of ticks costs one widget update instead of one each,
+and UI work is bounded by the frame rate rather than the tick rate.
+"""
+import queue
+
+import metrics
+
+UI_MAX_FPS = 10
+_EMPTY = object()
+
+
+class UiDispatcher:
+    def __init__(self, widget, apply, max_fps=UI_MAX_FPS):
+        """``apply(snapshot)`` runs on the Tk thread with the newest published snapshot."""
+        self.widget = widget
+        self.apply = apply
+        self.interval_ms = max(int(1000 / max_fps), 1)
+        self._queue = queue.SimpleQueue()
+        self._job = None
+        self.received = 0
+        self.applied = 0
+
+    def publish(self, snapshot):
+        """Queues a snapshot; safe to call from any thread."""
+        self._queue.put(snapshot)
+
+    def start(self):
+        self._job = self.widget.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def drain(self):
+        """Applies the newest pending snapshot, if any; returns whether one was applied."""
+        latest = _EMPTY
+        pending = 0
+        try:
+            while True:
+                latest = self._queue.get_nowait()
+                pending += 1
+        except queue.Empty:
+            pass
+        if latest is _EMPTY:
+            return False
+        self.received += pending
+        metrics.UI_COALESCED.inc(pending - 1)
+        with metrics.STAGE_SECONDS.labels('ui').time():
+            self.apply(latest)
+        self.applied += 1
+        return True
+
+    def _drain(self):
+        try:
+            self.drain()
+        except Exception as e:
+            print(f"Error updating UI: {e}")
+        self._job = self.widget.after(self.interval_ms, self._drain)